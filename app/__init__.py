@@ -3,8 +3,13 @@ PDF Assistant Flask Application Factory
 """
 import os
 import sys
+import queue
 import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ProcessPoolExecutor
 from flask import Flask
+from cachetools import TTLCache
 
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -15,6 +20,99 @@ from utils.rag import RAGSystem
 from utils.llm import get_llm_model
 from utils.web_search import WebSearch
 
+def _load_embedding_model():
+    """Load the embedding model, preferring an int8 ONNX export when configured"""
+    onnx_dir = os.getenv('EMBEDDING_ONNX_DIR')
+    if onnx_dir:
+        try:
+            from utils.onnx_embedder import ONNXEmbedder
+            return ONNXEmbedder(onnx_dir)
+        except Exception as e:
+            logging.warning(
+                f"Failed to load ONNX embedding model from {onnx_dir}: {str(e)}. "
+                "Falling back to SentenceTransformer."
+            )
+    from utils.device import detect_device
+    return SentenceTransformer('all-MiniLM-L6-v2', device=detect_device())
+
+
+_PDF_POOL = None
+_PDF_POOL_PID = None
+_PDF_POOL_LOCK = threading.Lock()
+
+def get_pdf_pool():
+    """Process-local pool for CPU-bound PDF page extraction.
+
+    Created lazily on first use rather than in create_app: under
+    gunicorn --preload create_app runs before the fork, and a
+    ProcessPoolExecutor built there would have its task/result pipes
+    inherited by every worker, which then race each other's submissions.
+    The pid key makes each worker (and any future fork) build its own.
+    """
+    global _PDF_POOL, _PDF_POOL_PID
+    with _PDF_POOL_LOCK:
+        if _PDF_POOL is None or _PDF_POOL_PID != os.getpid():
+            _PDF_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+            _PDF_POOL_PID = os.getpid()
+        return _PDF_POOL
+
+
+_LOG_LISTENER = None
+_LOG_PID = None
+
+def _setup_queue_logging():
+    """Install the queue-based log pipeline, once per process.
+
+    create_app can run several times (tests, scripts building multiple
+    apps); installing a fresh QueueHandler and listener thread each call
+    would duplicate every record and leak threads, so within one process
+    the first call wins. The guard is keyed on the pid because threads do
+    not survive fork: a gunicorn --preload worker inherits the master's
+    QueueHandler but not its listener thread, leaving an unbounded queue
+    nobody drains — each forked child therefore reinstalls the pipeline.
+    """
+    global _LOG_LISTENER, _LOG_PID
+    if _LOG_LISTENER is not None and _LOG_PID == os.getpid():
+        return _LOG_LISTENER
+
+    root_logger = logging.getLogger()
+    # Drop queue handlers inherited from the parent process: they feed a
+    # queue whose listener thread exists only there
+    for handler in list(root_logger.handlers):
+        if isinstance(handler, QueueHandler):
+            root_logger.removeHandler(handler)
+
+    # Route records through a queue so request threads never block on
+    # disk I/O; a background listener thread drains them to file/stream
+    log_queue = queue.Queue(-1)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler("app.log")
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    listener = QueueListener(log_queue, file_handler, stream_handler,
+                             respect_handler_level=True)
+    listener.start()
+
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(QueueHandler(log_queue))
+    if _LOG_PID is None:
+        # First setup in this interpreter: have forked children (gunicorn
+        # workers, process pools) rebuild their own listener on arrival
+        os.register_at_fork(after_in_child=_setup_queue_logging)
+    _LOG_LISTENER = listener
+    _LOG_PID = os.getpid()
+    return listener
+
+
+# Preload heavy models at import time, before gunicorn forks workers.
+# With `gunicorn --preload` the ~90MB of model weights are loaded once in the
+# master process and shared with workers via copy-on-write pages, instead of
+# being reloaded on every worker boot.
+_EMBEDDING_MODEL = _load_embedding_model()
+_LLM_MODEL = get_llm_model()
+
 
 def create_app(config_name='development'):
     """Application factory pattern for creating Flask app"""
@@ -28,32 +126,29 @@ def create_app(config_name='development'):
     # Ensure upload directory exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler("app.log"),
-            logging.StreamHandler()
-        ]
-    )
+    # Non-blocking logging, configured once per process
+    app.log_listener = _setup_queue_logging()
     
     # Initialize components
     with app.app_context():
         # Initialize vector store
         app.vector_store = VectorStore()
         
-        # Initialize embedding model
-        app.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        
-        # Initialize LLM model
-        app.llm_model = get_llm_model()
+        # Share the preloaded embedding model (loaded once at import)
+        app.embedding_model = _EMBEDDING_MODEL
+
+        # Share the preloaded LLM model (loaded once at import)
+        app.llm_model = _LLM_MODEL
         
         # Initialize web search
         app.web_search = WebSearch()
         
         # Initialize RAG system
         app.rag_system = RAGSystem(app.vector_store, app.embedding_model, app.llm_model)
+
+        # Response cache for repeated queries (invalidated via vector store version)
+        app.query_cache = TTLCache(maxsize=1000, ttl=3600)
+        app.query_cache_stats = {'hits': 0, 'misses': 0}
     
     # Register blueprints
     from .routes import main as main_blueprint
@@ -2,35 +2,75 @@
 PDF Assistant Routes
 """
 import os
+import re
 import sys
 import time
 import logging
+import tempfile
+import threading
 from flask import Blueprint, render_template, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from typing import Dict, List, Any
 import hashlib
 
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.pdf_parser import extract_text_from_pdf
+from utils.pdf_parser import extract_text_from_pdf, extract_text_from_pdf_parallel
 from utils.embeddings import generate_embeddings
 
 # Create blueprint
 main = Blueprint('main', __name__)
 logger = logging.getLogger(__name__)
 
-# Allowed file extensions
-ALLOWED_EXTENSIONS = {'pdf'}
+# Allowed file extensions (tuple form for str.endswith)
+ALLOWED_EXTENSIONS = ('.pdf',)
+
+# Filenames matching this are already safe and can skip secure_filename
+_SAFE_FILENAME_RE = re.compile(r'^[A-Za-z0-9_.\-]{1,255}\.pdf$', re.I)
+
+# Singleflight state: concurrent requests for the same cache key wait on the
+# first one's result instead of each fanning out to the LLM
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+class _InflightQuery:
+    """Holds the result of an in-flight RAG query for coalesced waiters"""
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
 
 def allowed_file(filename: str) -> bool:
     """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    # Single-pass suffix check; avoids the rsplit allocation per call
+    return filename.lower().endswith(ALLOWED_EXTENSIONS)
+
+# Chunk size for streaming reads (1MB)
+HASH_CHUNK_SIZE = 1 << 20
 
 def get_file_hash(file_content: bytes) -> str:
     """Generate hash for file content"""
+    if blake3 is not None:
+        return blake3.blake3(file_content).hexdigest()
     return hashlib.md5(file_content).hexdigest()
 
+def get_stream_hash(stream) -> str:
+    """Hash a file-like object in chunks without reading it all into memory
+
+    Uses BLAKE3 (SIMD tree hash) when available, falling back to MD5.
+    The stream is rewound afterwards so it can be read again.
+    """
+    hasher = blake3.blake3() if blake3 is not None else hashlib.md5()
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+        hasher.update(chunk)
+    stream.seek(0)
+    return hasher.hexdigest()
+
 @main.route('/')
 def index():
     """Home page"""
@@ -40,55 +80,81 @@ def index():
 def upload_file():
     """Handle PDF file upload and processing"""
     try:
+        # Short-circuit oversized uploads from the Content-Length header
+        # before buffering any of the body
+        max_length = current_app.config.get('MAX_CONTENT_LENGTH')
+        if max_length and request.content_length and request.content_length > max_length:
+            return jsonify({"error": "File too large"}), 413
+
         if 'file' not in request.files:
             return jsonify({"error": "No file uploaded"}), 400
-        
+
         file = request.files['file']
         if file.filename == '':
             return jsonify({"error": "No file selected"}), 400
-        
+
         if not allowed_file(file.filename):
             return jsonify({"error": "Invalid file type. Only PDF files are allowed."}), 400
+
+        # Secure filename (skip the regex rewrite when the name is already safe)
+        if _SAFE_FILENAME_RE.match(file.filename):
+            filename = file.filename
+        else:
+            filename = secure_filename(file.filename)
         
-        # Secure filename
-        filename = secure_filename(file.filename)
-        
-        # Read file content
-        file_content = file.read()
-        file_hash = get_file_hash(file_content)
-        
-        # Check if file already processed
-        if current_app.vector_store.has_document(file_hash):
+        # Stream the upload to a temp file on disk instead of buffering the
+        # whole PDF in memory (peak RSS was 2x file size per request)
+        temp_fd, temp_path = tempfile.mkstemp(
+            suffix='.pdf', dir=current_app.config['UPLOAD_FOLDER']
+        )
+        os.close(temp_fd)
+        try:
+            file.save(temp_path)
+
+            # Hash the temp file in streaming chunks
+            with open(temp_path, 'rb') as f:
+                file_hash = get_stream_hash(f)
+
+            # Check if file already processed
+            if current_app.vector_store.has_document(file_hash):
+                return jsonify({
+                    "message": "File already processed",
+                    "document_id": file_hash,
+                    "filename": filename
+                })
+
+            # Extract text from PDF by path, spreading pages across the
+            # worker's process pool for larger documents
+            from app import get_pdf_pool
+            text = extract_text_from_pdf_parallel(
+                temp_path, executor=get_pdf_pool()
+            )
+            if not text or text.startswith("ERROR"):
+                return jsonify({"error": "Could not extract text from PDF"}), 400
+
+            # Chunk and embed (file hash reused as the doc-level cache key)
+            embedding_data = generate_embeddings(text, doc_id=file_hash)
+            text_chunks = embedding_data['chunks']
+
+            # Store in vector database
+            doc_id = current_app.vector_store.add_document(
+                document_id=file_hash,
+                text_chunks=text_chunks,
+                embeddings=embedding_data['embeddings'],
+                metadata={"filename": filename, "upload_time": time.time()}
+            )
+
+            logger.info(f"Successfully processed document: {filename} (ID: {doc_id})")
+
             return jsonify({
-                "message": "File already processed",
-                "document_id": file_hash,
-                "filename": filename
+                "message": "File processed successfully",
+                "document_id": doc_id,
+                "filename": filename,
+                "chunks_processed": len(text_chunks)
             })
-        
-        # Extract text from PDF
-        text_chunks = extract_text_from_pdf(file_content)
-        if not text_chunks:
-            return jsonify({"error": "Could not extract text from PDF"}), 400
-        
-        # Generate embeddings
-        embeddings = generate_embeddings(text_chunks)
-        
-        # Store in vector database
-        doc_id = current_app.vector_store.add_document(
-            document_id=file_hash,
-            text_chunks=text_chunks,
-            embeddings=embeddings,
-            metadata={"filename": filename, "upload_time": time.time()}
-        )
-        
-        logger.info(f"Successfully processed document: {filename} (ID: {doc_id})")
-        
-        return jsonify({
-            "message": "File processed successfully",
-            "document_id": doc_id,
-            "filename": filename,
-            "chunks_processed": len(text_chunks)
-        })
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
         
     except Exception as e:
         logger.error(f"Error processing upload: {str(e)}")
@@ -107,12 +173,58 @@ def query_documents():
             return jsonify({"error": "Empty query"}), 400
         
         use_web_search = data.get('use_web_search', False)
-        
-        # Process query using RAG system
-        response = current_app.rag_system.query(
-            question=query
-        )
-        
+
+        # Check response cache first (keyed on query + document set version so
+        # uploads/deletions invalidate stale answers)
+        cache_key = hashlib.sha256(
+            f"{query}|{current_app.vector_store.version()}".encode()
+        ).hexdigest()
+
+        cached_response = current_app.query_cache.get(cache_key)
+        if cached_response is not None:
+            current_app.query_cache_stats['hits'] += 1
+            return jsonify({
+                "response": cached_response,
+                "query": query,
+                "cached": True,
+                "timestamp": time.time()
+            })
+
+        current_app.query_cache_stats['misses'] += 1
+
+        # Coalesce with any identical query already being processed
+        with _inflight_lock:
+            entry = _inflight.get(cache_key)
+            is_owner = entry is None
+            if is_owner:
+                entry = _InflightQuery()
+                _inflight[cache_key] = entry
+
+        if not is_owner:
+            entry.event.wait(timeout=120)
+            if entry.response is not None:
+                return jsonify({
+                    "response": entry.response,
+                    "query": query,
+                    "coalesced": True,
+                    "timestamp": time.time()
+                })
+            # The owning request failed or timed out; fall through and run
+
+        try:
+            # Process query using RAG system
+            response = current_app.rag_system.query(
+                question=query
+            )
+
+            current_app.query_cache[cache_key] = response
+            entry.response = response
+        finally:
+            if is_owner:
+                entry.event.set()
+                with _inflight_lock:
+                    _inflight.pop(cache_key, None)
+
         return jsonify({
             "response": response,
             "query": query,
@@ -170,6 +282,18 @@ def summarize_document(doc_id: str):
         logger.error(f"Error summarizing document {doc_id}: {str(e)}")
         return jsonify({"error": "Failed to generate summary"}), 500
 
+@main.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """Report query cache hit/miss statistics"""
+    stats = current_app.query_cache_stats
+    return jsonify({
+        "hits": stats['hits'],
+        "misses": stats['misses'],
+        "size": len(current_app.query_cache),
+        "maxsize": current_app.query_cache.maxsize,
+        "ttl": current_app.query_cache.ttl
+    })
+
 @main.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
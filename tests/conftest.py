@@ -0,0 +1,34 @@
+"""Shared pytest fixtures for the test suite
+
+Model-backed components are session-scoped so the ~90MB embedding model and
+the LLM client are constructed once per run instead of once per test module.
+"""
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def llm():
+    """Session-wide SimpleLLM instance"""
+    from utils.simple_llm import SimpleLLM
+    return SimpleLLM()
+
+
+@pytest.fixture(scope='session')
+def vector_store(tmp_path_factory):
+    """Session-wide VectorStore backed by a temp directory"""
+    from utils.vector_store import VectorStore
+    store_path = tmp_path_factory.mktemp('vector_store') / 'vector_store.pkl'
+    return VectorStore(store_path=str(store_path))
+
+
+@pytest.fixture(scope='session')
+def rag(vector_store, llm):
+    """Session-wide RAGSystem wired to the shared store and LLM"""
+    from utils.rag import RAGSystem
+    return RAGSystem(vector_store, None, llm)
@@ -1,12 +1,33 @@
 """
 Comprehensive test to verify the PDF Assistant upload system
 """
+import asyncio
 import requests
 import os
 import tempfile
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+BASE_URL = "http://127.0.0.1:5000"
+
+async def probe_endpoints_async():
+    """Probe the independent read-only endpoints concurrently
+
+    Fans /health, /documents, and /query out with httpx.AsyncClient so the
+    check takes max-of-latencies instead of sum-of-latencies.
+    """
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=30) as client:
+        return await asyncio.gather(
+            client.get("/health"),
+            client.get("/documents"),
+            client.post("/query", json={"query": "test", "use_web_search": False}),
+        )
+
 def create_test_pdf():
     """Create a test PDF file for testing"""
     # Create a temporary PDF file
@@ -153,21 +174,22 @@ if __name__ == "__main__":
         print("=" * 50)
         
         try:
-            # Test health
-            response = requests.get("http://127.0.0.1:5000/health")
-            print(f"Health check: {'✅ PASS' if response.status_code == 200 else '❌ FAIL'}")
-            
-            # Test documents listing
-            response = requests.get("http://127.0.0.1:5000/documents") 
-            print(f"Documents API: {'✅ PASS' if response.status_code == 200 else '❌ FAIL'}")
-            
-            # Test query endpoint
-            response = requests.post("http://127.0.0.1:5000/query", 
-                                   json={"query": "test", "use_web_search": False},
-                                   headers={'Content-Type': 'application/json'})
-            print(f"Query API: {'✅ PASS' if response.status_code == 200 else '❌ FAIL'}")
-            
+            if httpx is not None:
+                # Probe all three endpoints concurrently
+                health, docs, query = asyncio.run(probe_endpoints_async())
+            else:
+                # Fall back to serial requests when httpx isn't installed
+                health = requests.get(f"{BASE_URL}/health")
+                docs = requests.get(f"{BASE_URL}/documents")
+                query = requests.post(f"{BASE_URL}/query",
+                                      json={"query": "test", "use_web_search": False},
+                                      headers={'Content-Type': 'application/json'})
+
+            print(f"Health check: {'✅ PASS' if health.status_code == 200 else '❌ FAIL'}")
+            print(f"Documents API: {'✅ PASS' if docs.status_code == 200 else '❌ FAIL'}")
+            print(f"Query API: {'✅ PASS' if query.status_code == 200 else '❌ FAIL'}")
+
             print("\n✅ Core upload system appears to be working!")
-            
+
         except Exception as e:
             print(f"❌ Error testing basic functionality: {e}")
@@ -1,7 +1,7 @@
 import unittest
 import os
 import tempfile
-from utils.pdf_parser import improved_chunking, process_pdf_multithreaded
+from utils.pdf_parser import extract_text_from_pdf, improved_chunking, process_pdf_multithreaded
 
 class TestPDFParser(unittest.TestCase):
     def setUp(self):
@@ -53,6 +53,14 @@ This is the second major section of the document.
         for metadata in chunk_metadata:
             self.assertIn("chunk_id", metadata)
 
+    def test_extract_text_from_pdf(self):
+        if not os.path.exists(self.test_pdf_path):
+            self.skipTest("Test PDF file not available")
+        text = extract_text_from_pdf(self.test_pdf_path)
+        self.assertIsInstance(text, str)
+        self.assertFalse(text.startswith("ERROR"), text)
+        self.assertIn("Test PDF content", text)
+
     def test_multithreaded_processing(self):
         if os.path.exists(self.test_pdf_path):
             result = process_pdf_multithreaded(self.test_pdf_path)
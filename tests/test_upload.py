@@ -0,0 +1,52 @@
+"""Integration test for the PDF upload route
+
+Exercises the full path: multipart upload -> text extraction ->
+chunking/embedding -> vector store insert -> listing -> deletion.
+"""
+import io
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("flask")
+fitz = pytest.importorskip("fitz")
+
+
+@pytest.fixture(scope='module')
+def client():
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def _sample_pdf_bytes():
+    """Build a small in-memory PDF with enough text to chunk"""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((50, 50), "Sorting algorithms arrange data in order. " * 20,
+                     fontsize=12)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_upload_roundtrip(client):
+    data = {'file': (io.BytesIO(_sample_pdf_bytes()), 'sample_upload.pdf')}
+    response = client.post('/upload', data=data,
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    doc_id = body['document_id']
+    if body.get('message') != 'File already processed':
+        assert body['chunks_processed'] > 0
+
+    # The document shows up in the listing, then cleans up
+    docs = client.get('/documents').get_json()
+    assert any(d['id'] == doc_id for d in docs['documents'])
+    assert client.delete(f'/document/{doc_id}').status_code == 200
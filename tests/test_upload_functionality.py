@@ -2,15 +2,28 @@
 Test script to verify PDF upload functionality
 """
 import requests
+from requests.adapters import HTTPAdapter
 import os
 
+try:
+    from requests_toolbelt.multipart.encoder import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
+
+# Shared session so all calls reuse one keep-alive connection instead of
+# paying TCP handshake + socket setup per request
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
 def test_upload_endpoint():
     """Test the upload endpoint"""
     url = "http://127.0.0.1:5000/upload"
     
-    # Check if there are any PDF files in uploads directory
+    # Check if there are any PDF files in uploads directory (scandir streams
+    # entries instead of building the full listing first)
     uploads_dir = "./uploads"
-    pdf_files = [f for f in os.listdir(uploads_dir) if f.endswith('.pdf')]
+    with os.scandir(uploads_dir) as entries:
+        pdf_files = [e.name for e in entries if e.name.endswith('.pdf')]
     
     if not pdf_files:
         print("❌ No PDF files found in uploads directory for testing")
@@ -24,8 +37,19 @@ def test_upload_endpoint():
     
     try:
         with open(file_path, 'rb') as f:
-            files = {'file': (test_file, f, 'application/pdf')}
-            response = requests.post(url, files=files)
+            if MultipartEncoder is not None:
+                # Stream the multipart body in chunks straight from disk
+                # instead of materializing the whole file in memory
+                encoder = MultipartEncoder(
+                    fields={'file': (test_file, f, 'application/pdf')}
+                )
+                response = SESSION.post(
+                    url, data=encoder,
+                    headers={'Content-Type': encoder.content_type}
+                )
+            else:
+                files = {'file': (test_file, f, 'application/pdf')}
+                response = SESSION.post(url, files=files)
         
         print(f"📊 Response status: {response.status_code}")
         print(f"📄 Response data: {response.json()}")
@@ -46,7 +70,7 @@ def test_documents_endpoint():
     url = "http://127.0.0.1:5000/documents"
     
     try:
-        response = requests.get(url)
+        response = SESSION.get(url)
         print(f"📊 Documents endpoint status: {response.status_code}")
         
         if response.status_code == 200:
@@ -67,7 +91,7 @@ def test_health_endpoint():
     url = "http://127.0.0.1:5000/health"
     
     try:
-        response = requests.get(url)
+        response = SESSION.get(url)
         print(f"🏥 Health check status: {response.status_code}")
         
         if response.status_code == 200:
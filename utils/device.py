@@ -0,0 +1,14 @@
+"""Shared device selection for model inference"""
+
+
+def detect_device():
+    """Pick the fastest available device for model inference"""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return 'cuda'
+        if hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
+            return 'mps'
+    except ImportError:
+        pass
+    return 'cpu'
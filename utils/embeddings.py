@@ -1,58 +1,248 @@
 from sentence_transformers import SentenceTransformer
 import numpy as np
-from utils.pdf_parser import split_into_chunks
+from utils.device import detect_device
+from utils.pdf_parser import split_into_chunks, ensure_text_is_string
 import os
 import pickle
 import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+def _inference_ctx():
+    """torch.inference_mode when torch is importable, else a no-op context"""
+    try:
+        import torch
+        return torch.inference_mode()
+    except ImportError:
+        import contextlib
+        return contextlib.nullcontext()
 
 # Initialize the model
-model = SentenceTransformer('all-MiniLM-L6-v2')
+_DEVICE = detect_device()
+model = SentenceTransformer('all-MiniLM-L6-v2', device=_DEVICE)
+if _DEVICE == 'cuda':
+    # fp16 weights double tensor-core throughput for encode
+    model = model.half()
 
-# Add caching for embeddings to improve performance
-def generate_embeddings(text, cache_dir="cache/embeddings"):
-    """Generate embeddings with caching for performance"""
-    # Create hash of the text for cache key
-    text_hash = hashlib.md5(text.encode()).hexdigest()
-    os.makedirs(cache_dir, exist_ok=True)
-    cache_path = os.path.join(cache_dir, f"{text_hash}.pkl")
-    
-    # Try to load from cache first
-    if os.path.exists(cache_path):
-        print(f"Loading embeddings from cache")
+# Warm the model once at import so the first request doesn't pay for lazy
+# CUDA context / kernel compilation
+try:
+    with _inference_ctx():
+        model.encode(["warmup"], show_progress_bar=False)
+except Exception as e:
+    logger.warning(f"Embedding model warmup failed: {str(e)}")
+
+# Larger batches saturate GPU tensor cores; smaller batches fit CPU caches
+_BATCH_SIZE = 256 if _DEVICE != 'cpu' else 64
+
+# Storage precision for encoded vectors: 'fp16' (default) or 'int8'
+# (quarter-size vectors, VNNI int8 dot products in downstream search)
+_PRECISION = os.getenv('EMBEDDING_PRECISION', 'fp16')
+
+# Documents with at least this many chunks are encoded batch-by-batch into a
+# memmapped cache file instead of materializing the full matrix in RAM
+_STREAM_THRESHOLD = 2048
+
+def _chunk_cache_key(chunk):
+    """Content hash used as the cache key for a single chunk
+
+    Prefers BLAKE3 (SIMD tree hash, with its internal thread pool for
+    inputs over 1MB); falls back to SHA-256, which dispatches to SHA-NI
+    instructions on CPUs that support them.
+    """
+    data = chunk.encode('utf-8')
+    if blake3 is not None:
+        if len(data) > (1 << 20):
+            return blake3.blake3(data, max_threads=blake3.blake3.AUTO).hexdigest()
+        return blake3.blake3(data).hexdigest()
+    return hashlib.sha256(data).hexdigest()
+
+def _encode_chunks(chunks):
+    """Batch-encode chunks, sorted by length to minimize padding waste"""
+    order = np.argsort([len(chunk) for chunk in chunks])
+    sorted_chunks = [chunks[i] for i in order]
+    encode_kwargs = dict(
+        batch_size=_BATCH_SIZE,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+        normalize_embeddings=True
+    )
+
+    if _PRECISION == 'int8':
         try:
-            with open(cache_path, "rb") as f:
-                return pickle.load(f)
-        except Exception as e:
-            print(f"Cache loading error: {str(e)}")
-    
-    # If cache miss or error, generate embeddings
-    print(f"Generating new embeddings")
-    
-    # Ensure text is a string
-    if isinstance(text, list):
-        text = ' '.join(text)
-    elif not isinstance(text, str):
-        text = str(text)
-    
+            with _inference_ctx():
+                sorted_embeddings = model.encode(
+                    sorted_chunks, precision='int8', **encode_kwargs
+                )
+            embeddings = np.empty_like(sorted_embeddings)
+            embeddings[order] = sorted_embeddings
+            return embeddings
+        except TypeError:
+            # precision= needs sentence-transformers >= 2.7
+            logger.warning("int8 precision not supported by installed sentence-transformers; using fp16")
+
+    with _inference_ctx():
+        sorted_embeddings = model.encode(sorted_chunks, **encode_kwargs)
+    embeddings = np.empty_like(sorted_embeddings)
+    embeddings[order] = sorted_embeddings
+    # fp16 halves cache size and memory bandwidth with negligible recall loss
+    return embeddings.astype(np.float16)
+
+def _save_chunk_list(path_base, chunks):
+    """Persist chunk texts to msgpack, or highest-protocol pickle without it"""
+    if msgpack is not None:
+        with open(path_base + '.mp', 'wb') as f:
+            msgpack.pack(chunks, f)
+    else:
+        with open(path_base + '.chunks.pkl', 'wb') as f:
+            pickle.dump(chunks, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _save_doc_cache(path_base, chunks, embeddings):
+    """Persist a whole-document cache entry.
+
+    Embeddings go to a raw .npy file (memory-mappable, no object-protocol
+    serialization) and chunk texts to msgpack, falling back to pickle at
+    its highest protocol when msgpack isn't installed.
+    """
+    try:
+        np.save(path_base + '.npy', embeddings)
+        _save_chunk_list(path_base, chunks)
+    except Exception as e:
+        logger.warning(f"Cache saving error: {str(e)}")
+
+def _load_doc_cache(path_base):
+    """Load a whole-document cache entry, or None on miss/error"""
+    npy_path = path_base + '.npy'
+    if not os.path.exists(npy_path):
+        return None
+    try:
+        # mmap so pages are read on demand by downstream similarity code
+        embeddings = np.load(npy_path, mmap_mode='r')
+        mp_path = path_base + '.mp'
+        if msgpack is not None and os.path.exists(mp_path):
+            with open(mp_path, 'rb') as f:
+                chunks = msgpack.unpack(f)
+        else:
+            with open(path_base + '.chunks.pkl', 'rb') as f:
+                chunks = pickle.load(f)
+        return {'chunks': chunks, 'embeddings': embeddings}
+    except Exception as e:
+        logger.warning(f"Cache loading error: {str(e)}")
+        return None
+
+# Add caching for embeddings to improve performance
+def generate_embeddings(text, doc_id=None, cache_dir="cache/embeddings"):
+    """Generate embeddings with per-chunk caching for performance
+
+    Chunks are cached individually keyed by their content hash, so
+    re-uploads and near-duplicate documents (new revisions of the same
+    PDF) only pay for the chunks that actually changed.
+
+    When the caller already has a content hash of the source file (the
+    upload route hashes the PDF bytes once), passing it as doc_id enables
+    a whole-document cache that skips chunking and hashing entirely on an
+    exact re-upload.
+    """
+    chunk_cache_dir = os.path.join(cache_dir, "chunks")
+    os.makedirs(chunk_cache_dir, exist_ok=True)
+
+    # Whole-document fast path keyed by the precomputed file hash
+    doc_cache_base = None
+    if doc_id is not None:
+        doc_cache_base = os.path.join(cache_dir, doc_id)
+        cached = _load_doc_cache(doc_cache_base)
+        if cached is not None:
+            return cached
+
+    # Normalize once here; split_into_chunks assumes str from this point on
+    text = ensure_text_is_string(text)
+
     # Split text into chunks
-    print(f"About to call split_into_chunks on text of type: {type(text)}")
     chunks = split_into_chunks(text)
-    
-    # Generate embeddings for each chunk
-    embeddings = model.encode(chunks)
-    
+
+    # Look up each chunk in the cache, collecting misses grouped by content
+    # hash: repeated chunks (boilerplate headers/footers that survive
+    # cleaning) are encoded once and scattered to every position
+    embeddings = [None] * len(chunks)
+    chunk_keys = [_chunk_cache_key(chunk) for chunk in chunks]
+    miss_by_key = {}
+    miss_count = 0
+    for i, key in enumerate(chunk_keys):
+        cache_path = os.path.join(chunk_cache_dir, f"{key}.npy")
+        if os.path.exists(cache_path):
+            try:
+                embeddings[i] = np.load(cache_path)
+                continue
+            except Exception as e:
+                logger.warning(f"Cache loading error: {str(e)}")
+        miss_by_key.setdefault(key, []).append(i)
+        miss_count += 1
+
+    logger.debug(
+        f"Embedding cache: {len(chunks) - miss_count} hits, {miss_count} misses "
+        f"({len(miss_by_key)} unique)"
+    )
+
+    # Large fresh documents: stream batches straight into a memmapped .npy
+    # so peak memory stays at one batch instead of the full matrix plus a
+    # serialization buffer
+    if (doc_cache_base is not None and miss_count == len(chunks)
+            and len(chunks) >= _STREAM_THRESHOLD):
+        try:
+            dim = model.get_sentence_embedding_dimension()
+            mm = np.lib.format.open_memmap(
+                doc_cache_base + '.npy', mode='w+',
+                dtype=np.float16, shape=(len(chunks), dim)
+            )
+            for start in range(0, len(chunks), _BATCH_SIZE):
+                batch = chunks[start:start + _BATCH_SIZE]
+                mm[start:start + len(batch)] = _encode_chunks(batch)
+            mm.flush()
+            _save_chunk_list(doc_cache_base, chunks)
+
+            # Populate the per-chunk cache from the memmapped rows
+            for i, key in enumerate(chunk_keys):
+                cache_path = os.path.join(chunk_cache_dir, f"{key}.npy")
+                if not os.path.exists(cache_path):
+                    np.save(cache_path, np.asarray(mm[i]))
+
+            return {'chunks': chunks, 'embeddings': mm}
+        except Exception as e:
+            logger.warning(f"Streaming encode error: {str(e)}")
+
+    # Encode one representative per unique missed chunk and write it back,
+    # fanning the vector out to every duplicate position
+    if miss_by_key:
+        unique_keys = list(miss_by_key)
+        miss_embeddings = _encode_chunks([chunks[miss_by_key[k][0]] for k in unique_keys])
+        for key, embedding in zip(unique_keys, miss_embeddings):
+            for i in miss_by_key[key]:
+                embeddings[i] = embedding
+            cache_path = os.path.join(chunk_cache_dir, f"{key}.npy")
+            try:
+                np.save(cache_path, embedding)
+            except Exception as e:
+                logger.warning(f"Cache saving error: {str(e)}")
+
     result = {
         'chunks': chunks,
-        'embeddings': embeddings
+        'embeddings': np.array(embeddings)
     }
-    
-    # Save to cache
-    try:
-        with open(cache_path, "wb") as f:
-            pickle.dump(result, f)
-    except Exception as e:
-        print(f"Cache saving error: {str(e)}")
-    
+
+    if doc_cache_base is not None:
+        _save_doc_cache(doc_cache_base, chunks, result['embeddings'])
+
     return result
 
 def generate_query_embedding(query):
@@ -65,4 +255,5 @@ def generate_query_embedding(query):
     Returns:
         numpy.ndarray: Embedding vector for the query
     """
-    return model.encode([query])[0]
\ No newline at end of file
+    with _inference_ctx():
+        return model.encode([query])[0]
\ No newline at end of file
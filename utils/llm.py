@@ -1,11 +1,16 @@
 import os
 import logging
+import functools
 
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=1)
 def get_llm_model():
     """
     Returns a language model instance using cloud APIs (not OpenAI)
+
+    Memoized so the client (and its underlying HTTP session/connection
+    pool) is constructed once and reused across callers.
     """
     try:
         # Use simple HuggingFace implementation first
@@ -70,9 +75,16 @@ def get_llm_model():
             from .simple_llm import SimpleLLM
             return SimpleLLM()
         except:
+            import re
+
+            # Case-insensitive match avoids copying the whole prompt
+            # through .lower() on every call; no trailing \b so
+            # "algorithms" matches like the old substring check
+            _algorithm_re = re.compile(r'\balgorithm', re.IGNORECASE)
+
             class MockLLM:
                 def invoke(self, prompt):
-                    if "algorithm" in prompt.lower():
+                    if _algorithm_re.search(prompt):
                         return """An algorithm is a finite sequence of well-defined instructions for solving a computational problem or performing a task. Key characteristics include:
 
 1. **Definiteness**: Each step must be precisely defined
@@ -0,0 +1,62 @@
+"""
+ONNX Runtime-backed embedding model
+"""
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ONNXEmbedder:
+    """SentenceTransformer-compatible encoder backed by ONNX Runtime.
+
+    Expects a model directory exported (and optionally int8-quantized)
+    offline with optimum, e.g.:
+
+        optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 \\
+            --task feature-extraction onnx_model/
+        optimum-cli onnxruntime quantize --avx512_vnni onnx_model/ quant/
+
+    ONNX Runtime gives roughly 4x CPU inference speedup over PyTorch eager
+    mode, and int8 quantization (VNNI dot products on modern x86) roughly
+    doubles throughput again while cutting model memory 4x.
+    """
+
+    def __init__(self, model_dir):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        self.model = ORTModelForFeatureExtraction.from_pretrained(model_dir)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        logger.info(f"Loaded ONNX embedding model from {model_dir}")
+
+    def encode(self, sentences, batch_size=64, convert_to_numpy=True,
+               show_progress_bar=False, normalize_embeddings=False):
+        """Encode sentences with mean pooling, mirroring SentenceTransformer.encode"""
+        single_input = isinstance(sentences, str)
+        if single_input:
+            sentences = [sentences]
+
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            inputs = self.tokenizer(
+                batch, padding=True, truncation=True, return_tensors='np'
+            )
+            outputs = self.model(**inputs)
+
+            # Mean pooling over valid tokens
+            token_embeddings = outputs.last_hidden_state
+            mask = np.expand_dims(inputs['attention_mask'], -1).astype('float32')
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(
+                mask.sum(axis=1), 1e-9, None
+            )
+            batches.append(pooled)
+
+        embeddings = np.vstack(batches).astype('float32')
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+
+        return embeddings[0] if single_input else embeddings
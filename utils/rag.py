@@ -1,19 +1,101 @@
 # Refactor into proper class structure
 
 import os
+import re
+import atexit
+import asyncio
 import logging
+import tempfile
+import threading
+import weakref
 import hashlib
+import json
 import pickle
 import numpy as np
 import fitz  # PyMuPDF - add this import
 from typing import List, Optional, Union
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.docstore.document import Document
 from sentence_transformers import SentenceTransformer
 
+from utils.device import detect_device
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
 logger = logging.getLogger(__name__)
 
+# Process-local SentenceTransformer instances (~100MB weights each):
+# every caller asking for the same (name, device) shares one copy
+_MODEL_CACHE = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+def get_model(name='all-MiniLM-L6-v2', device=None):
+    """Return the shared per-process SentenceTransformer for name/device"""
+    device = device or detect_device()
+    key = (name, device)
+    with _MODEL_CACHE_LOCK:
+        model = _MODEL_CACHE.get(key)
+        if model is None:
+            model = SentenceTransformer(name, device=device)
+            _MODEL_CACHE[key] = model
+        return model
+
+# Open fitz documents memoized per process; weak values let the cache
+# drop entries as soon as no caller holds the document
+_FITZ_CACHE = weakref.WeakValueDictionary()
+
+def _open_pdf(path):
+    """Open a PDF, reusing a process-local handle for unchanged files"""
+    key = (os.path.realpath(path), os.path.getmtime(path))
+    doc = _FITZ_CACHE.get(key)
+    if doc is None or doc.is_closed:
+        doc = fitz.open(path)
+        try:
+            _FITZ_CACHE[key] = doc
+        except TypeError:
+            # fitz builds whose Document doesn't support weak references
+            pass
+    return doc
+
+# Static system prefix, kept byte-identical across calls (no timestamps or
+# per-request values) so LLM backends with prefix KV caching — llama.cpp
+# cache_prompt, Ollama keep_alive, OpenAI-compatible prompt_cache_key — can
+# reuse the prefilled prefix instead of re-processing it on every query.
+# Per-query content (context, question) goes strictly after this prefix.
+RAG_SYSTEM_PROMPT = """
+You are a knowledgeable AI assistant specializing in providing clear, well-structured answers.
+Please answer the user's question based on the provided context information.
+
+INSTRUCTIONS:
+- Provide a comprehensive, well-organized response
+- Use bullet points, numbered lists, or sections when appropriate
+- Include relevant examples or details from the context
+- If the context doesn't contain enough information, clearly state what you know and what you cannot determine
+- Format your response to be easy to read and understand
+"""
+
+RAG_PROMPT_TEMPLATE = RAG_SYSTEM_PROMPT + """
+CONTEXT INFORMATION:
+{context}
+
+USER QUESTION: {question}
+
+RESPONSE:
+"""
+
+# Response-formatting patterns, compiled once at import instead of per call
+_NUM_LIST_RE = re.compile(r'^(\d+)\.\s*', re.MULTILINE)
+_BULLET_RE = re.compile(r'^[\*\-]\s*', re.MULTILINE)
+_EXTRA_NL_RE = re.compile(r'\n{3,}')
+# Prompt/instruction lines echoed back by some LLMs; a tuple startswith
+# beats a regex for this handful of fixed literals
+_SKIP_PREFIXES = ('You are', 'INSTRUCTIONS:', 'CONTEXT INFORMATION:',
+                  'USER QUESTION:', 'RESPONSE:')
+
 class RAGSystem:
     def __init__(self, vector_store, embedding_model=None, llm_model=None):
         """Initialize the RAG system with required components.
@@ -27,15 +109,26 @@ class RAGSystem:
         
         # Use provided embedding model or create default
         if embedding_model is None:
-            try:
-                from sentence_transformers import SentenceTransformer
-                self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-                self.is_sentence_transformer = True
-                logger.info("Using default SentenceTransformer model: all-MiniLM-L6-v2")
-            except ImportError:
-                logger.warning("sentence-transformers package not found. Please install it or provide embedding_model.")
-                self.embedding_model = None
-                self.is_sentence_transformer = False
+            # ONNX Runtime export when one is configured, otherwise the
+            # stock model on the fastest available device
+            onnx_dir = os.getenv('EMBEDDING_ONNX_DIR')
+            if onnx_dir:
+                try:
+                    from utils.onnx_embedder import ONNXEmbedder
+                    self.embedding_model = ONNXEmbedder(onnx_dir)
+                    self.is_sentence_transformer = True
+                    logger.info(f"Using ONNX embedding model from {onnx_dir}")
+                except Exception as e:
+                    logger.warning(f"ONNX embedder unavailable ({str(e)}); falling back to SentenceTransformer")
+            if not getattr(self, 'embedding_model', None):
+                try:
+                    self.embedding_model = get_model('all-MiniLM-L6-v2')
+                    self.is_sentence_transformer = True
+                    logger.info("Using default SentenceTransformer model: all-MiniLM-L6-v2")
+                except ImportError:
+                    logger.warning("sentence-transformers package not found. Please install it or provide embedding_model.")
+                    self.embedding_model = None
+                    self.is_sentence_transformer = False
         else:
             self.embedding_model = embedding_model
             # Determine type of embedding model for proper method calling
@@ -44,19 +137,38 @@ class RAGSystem:
             
         # Use provided LLM model or re-use existing
         self.llm_model = llm_model
+
+        # Query-embedding cache: repeated questions (and the second lookup
+        # _rerank_documents makes for the same question) skip the encoder
+        self._query_embedding_cache = {}
+
+        # Optional second-stage reranker, run only on the top few bi-encoder
+        # candidates; set RAG_CROSS_ENCODER to a model name to enable
+        self.cross_encoder = None
+        cross_encoder_name = os.getenv('RAG_CROSS_ENCODER')
+        if cross_encoder_name:
+            try:
+                from sentence_transformers import CrossEncoder
+                self.cross_encoder = CrossEncoder(cross_encoder_name, device=detect_device())
+                logger.info(f"Using cross-encoder reranker: {cross_encoder_name}")
+            except Exception as e:
+                logger.warning(f"Cross-encoder unavailable ({str(e)}); using bi-encoder scores only")
         logger.info("RAG system initialized successfully")
         
-    def query(self, question, context=None, k=3, rerank=True):
+    def query(self, question, context=None, k=3, rerank=True, stream=False):
         """Process a query using the RAG pattern.
-        
+
         Args:
             question: The user question to answer
             context: Optional pre-provided context documents
             k: Number of documents to retrieve
             rerank: Whether to rerank retrieved documents
-            
+            stream: Yield response chunks as the LLM produces them when the
+                backend supports streaming (falls back to a full response)
+
         Returns:
-            Generated response based on retrieved/provided context
+            Generated response based on retrieved/provided context, or an
+            iterator of response chunks when streaming
         """
         try:
             # If context is provided, use it directly
@@ -89,8 +201,8 @@ class RAGSystem:
                     
             # Generate response with context
             logger.info("Generating response with context")
-            response = self._generate_response(question, relevant_docs)
-            
+            response = self._generate_response(question, relevant_docs, stream=stream)
+
             return response
         except Exception as e:
             error_msg = f"RAG query failed: {str(e)}"
@@ -110,18 +222,28 @@ class RAGSystem:
             if not self.embedding_model:
                 logger.warning("No embedding model available")
                 return None
-                
+
+            cached = self._query_embedding_cache.get(text)
+            if cached is not None:
+                return cached
+
             if self.is_sentence_transformer:
-                return self.embedding_model.encode(text)
+                embedding = self.embedding_model.encode(text)
             else:
                 # For HuggingFaceEmbeddings or similar interfaces
                 if hasattr(self.embedding_model, 'embed_query'):
-                    return self.embedding_model.embed_query(text)
+                    embedding = self.embedding_model.embed_query(text)
                 elif hasattr(self.embedding_model, 'embed_documents'):
-                    return self.embedding_model.embed_documents([text])[0]
+                    embedding = self.embedding_model.embed_documents([text])[0]
                 else:
                     logger.error("Embedding model has no supported embedding method")
                     return None
+
+            # Bounded FIFO eviction keeps the cache from growing without limit
+            if len(self._query_embedding_cache) >= 1024:
+                self._query_embedding_cache.pop(next(iter(self._query_embedding_cache)))
+            self._query_embedding_cache[text] = embedding
+            return embedding
         except Exception as e:
             logger.error(f"Error generating query embedding: {str(e)}")
             return None
@@ -153,101 +275,118 @@ class RAGSystem:
                 logger.warning("Failed to generate question embedding for reranking")
                 return documents
                 
-            # Calculate similarity scores
-            scored_docs = []
-            
-            for doc in documents:
-                # Get document text
-                doc_text = doc.page_content if hasattr(doc, 'page_content') else str(doc)
-                
-                # Calculate embedding and similarity
-                try:
-                    # Get document embedding using appropriate method
-                    if self.is_sentence_transformer:
-                        doc_embedding = self.embedding_model.encode(doc_text)
-                    else:
-                        if hasattr(self.embedding_model, 'embed_documents'):
-                            doc_embedding = self.embedding_model.embed_documents([doc_text])[0]
-                        else:
-                            logger.warning("Embedding model doesn't support document embedding")
-                            return documents
-                    
-                    # Calculate cosine similarity
-                    similarity = np.dot(question_embedding, doc_embedding) / (
-                        np.linalg.norm(question_embedding) * np.linalg.norm(doc_embedding)
-                    )
-                    
-                    # Save score to document metadata for future reference
-                    if hasattr(doc, 'metadata'):
-                        doc.metadata['score'] = float(similarity)
-                        
-                    scored_docs.append((doc, similarity))
-                except Exception as e:
-                    logger.error(f"Error calculating similarity for document: {str(e)}")
-                    scored_docs.append((doc, 0.0))
-            
+            # Embed every candidate in one batched call; the per-document
+            # loop paid a full model dispatch per text
+            doc_texts = [
+                doc.page_content if hasattr(doc, 'page_content') else str(doc)
+                for doc in documents
+            ]
+            if self.is_sentence_transformer:
+                doc_embeddings = self.embedding_model.encode(
+                    doc_texts, batch_size=32, convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
+            elif hasattr(self.embedding_model, 'embed_documents'):
+                doc_embeddings = np.asarray(
+                    self.embedding_model.embed_documents(doc_texts)
+                )
+            else:
+                logger.warning("Embedding model doesn't support document embedding")
+                return documents
+
+            # Cosine similarity as one matrix-vector product. The encode
+            # path above already returns unit vectors (normalize_embeddings
+            # =True), so only the embed_documents path pays the row
+            # normalization; the epsilon guards zero-vectors
+            doc_embeddings = np.asarray(doc_embeddings, dtype=np.float32)
+            if not self.is_sentence_transformer:
+                doc_embeddings = doc_embeddings / (
+                    np.linalg.norm(doc_embeddings, axis=1, keepdims=True) + 1e-12
+                )
+            question_embedding = np.asarray(question_embedding, dtype=np.float32)
+            q = question_embedding / (np.linalg.norm(question_embedding) + 1e-12)
+            similarities = doc_embeddings @ q
+
+            # Save scores to document metadata for future reference
+            for doc, similarity in zip(documents, similarities):
+                if hasattr(doc, 'metadata'):
+                    doc.metadata['score'] = float(similarity)
+
             # Sort by score in descending order
-            scored_docs.sort(key=lambda x: x[1], reverse=True)
-            
-            # Return just the documents
-            return [doc for doc, score in scored_docs]
+            order = np.argsort(-similarities)
+
+            # Second stage: rescore only the top K with the cross-encoder
+            # (one forward per candidate, so restricting to K saves N-K
+            # forwards); the remaining docs keep their bi-encoder order
+            if self.cross_encoder is not None and len(order) > 1:
+                k = min(3, len(order))
+                top = order[:k]
+                cross_scores = np.asarray(self.cross_encoder.predict(
+                    [(question, doc_texts[i]) for i in top]
+                ))
+                top = top[np.argsort(-cross_scores)]
+                for i, score in zip(top, -np.sort(-cross_scores)):
+                    if hasattr(documents[i], 'metadata'):
+                        documents[i].metadata['score'] = float(score)
+                order = np.concatenate([top, order[k:]])
+
+            return [documents[i] for i in order]
         except Exception as e:
             logger.error(f"Error during document re-ranking: {str(e)}")
             # Fall back to original documents if re-ranking fails
             return documents
             
-    def _generate_response(self, question, context):
+    def _generate_response(self, question, context, stream=False):
         """Generate response using the LLM with context.
-        
+
         Args:
             question: User question
             context: Retrieved documents providing context
-            
+            stream: Yield chunks as they arrive instead of waiting for the
+                full completion (requires a backend with a stream method)
+
         Returns:
-            Generated response text
+            Generated response text, or a chunk iterator when streaming
         """
         try:
             if not self.llm_model:
                 return "No language model available to generate a response."
             
-            # Prepare prompt with context
-            context_text = ""
-            
+            # Prepare prompt with context, collecting pieces and joining
+            # once (repeated += copies the growing string per document)
+            parts = []
+
             # Extract and limit context to prevent token overflow
             for i, doc in enumerate(context[:5]):  # Limit to 5 documents
                 if hasattr(doc, 'page_content'):
                     doc_text = doc.page_content
-                    source = f" (Source: {doc.metadata.get('source', 'unknown')}" if hasattr(doc, 'metadata') else ""
-                    if hasattr(doc, 'metadata') and 'page' in doc.metadata:
-                        source += f", Page: {doc.metadata['page'] + 1})"
+                    metadata = getattr(doc, 'metadata', None)
+                    if metadata is not None:
+                        source = f" (Source: {metadata.get('source', 'unknown')}"
+                        if 'page' in metadata:
+                            source += f", Page: {metadata['page'] + 1})"
+                        else:
+                            source += ")"
                     else:
-                        source += ")"
+                        source = ""
                 else:
                     doc_text = str(doc)
                     source = ""
-                
-                # Add to context with numbering and source info
-                context_text += f"[{i+1}]{source}\n{doc_text.strip()}\n\n"
-              # Create a well-formatted prompt that includes the context and question
-            prompt = f"""
-You are a knowledgeable AI assistant specializing in providing clear, well-structured answers. 
-Please answer the user's question based on the provided context information.
-
-INSTRUCTIONS:
-- Provide a comprehensive, well-organized response
-- Use bullet points, numbered lists, or sections when appropriate
-- Include relevant examples or details from the context
-- If the context doesn't contain enough information, clearly state what you know and what you cannot determine
-- Format your response to be easy to read and understand
-
-CONTEXT INFORMATION:
-{context_text.strip()}
 
-USER QUESTION: {question}
+                # Add to context with numbering and source info
+                parts.append(f"[{i+1}]{source}\n{doc_text.strip()}")
 
-RESPONSE:
-"""
+            # Fill the shared template so the static system prefix stays
+            # byte-identical across calls (enables backend KV-prefix reuse)
+            prompt = RAG_PROMPT_TEMPLATE.format(
+                context="\n\n".join(parts), question=question
+            )
             
+            # Stream chunks as they arrive: perceived latency drops from
+            # retrieve + full generation to retrieve + time-to-first-token
+            if stream and hasattr(self.llm_model, 'stream'):
+                return self._stream_response(prompt)
+
             # Generate response using the LLM
             try:
                 # Handle different LLM interfaces
@@ -288,7 +427,25 @@ RESPONSE:
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             return f"I encountered an error while generating a response: {str(e)}"
-    
+
+    def _stream_response(self, prompt):
+        """Yield response text chunks as the LLM produces them.
+
+        Chunks are passed through raw; callers wanting the cleaned-up form
+        should accumulate them and run _format_response on the final string.
+        """
+        try:
+            for chunk in self.llm_model.stream(prompt):
+                # LangChain chat models yield message chunks; others yield str
+                text = getattr(chunk, 'content', None)
+                if text is None:
+                    text = chunk if isinstance(chunk, str) else str(chunk)
+                if text:
+                    yield text
+        except Exception as e:
+            logger.error(f"Error in LLM streaming: {str(e)}")
+            yield f"I encountered an error while generating a response: {str(e)}"
+
     def _format_response(self, response_text):
         """Format the response text for better readability"""
         if not response_text or not isinstance(response_text, str):
@@ -297,34 +454,30 @@ RESPONSE:
         # Clean up the response
         formatted_response = response_text.strip()
         
-        # Remove any duplicate prompts or unwanted text
-        lines = formatted_response.split('\n')
+        # Drop echoed prompt/instruction text and leading blanks in one
+        # pass; interior blank lines stay so paragraph breaks survive
         cleaned_lines = []
-        
-        for line in lines:
+        for line in formatted_response.split('\n'):
             line = line.strip()
-            # Skip empty lines at the beginning
             if not line and not cleaned_lines:
                 continue
-            # Skip lines that look like prompts or instructions
-            if line.startswith(('You are', 'INSTRUCTIONS:', 'CONTEXT INFORMATION:', 'USER QUESTION:', 'RESPONSE:')):
+            if line.startswith(_SKIP_PREFIXES):
                 continue
             cleaned_lines.append(line)
-        
+
         # Rejoin lines and format
         formatted_response = '\n'.join(cleaned_lines).strip()
-        
+
         # Add some basic formatting improvements
         # Convert numbered lists to proper format
-        import re
-        formatted_response = re.sub(r'^(\d+)\.\s*', r'\n\1. ', formatted_response, flags=re.MULTILINE)
-        
+        formatted_response = _NUM_LIST_RE.sub(r'\n\1. ', formatted_response)
+
         # Ensure proper spacing around bullet points
-        formatted_response = re.sub(r'^[\*\-]\s*', r'\n• ', formatted_response, flags=re.MULTILINE)
-        
+        formatted_response = _BULLET_RE.sub(r'\n• ', formatted_response)
+
         # Clean up extra newlines
-        formatted_response = re.sub(r'\n{3,}', '\n\n', formatted_response)
-        
+        formatted_response = _EXTRA_NL_RE.sub('\n\n', formatted_response)
+
         return formatted_response.strip()
     
     def summarize_document(self, doc_id):
@@ -425,108 +578,293 @@ Key Information:
 
 For detailed analysis, try asking specific questions about the document content."""
 
+# Plain-text extraction flags: skip image and ligature preservation, work
+# the chunker would immediately discard anyway
+try:
+    _TEXT_FLAGS = (fitz.TEXTFLAGS_TEXT
+                   & ~fitz.TEXT_PRESERVE_IMAGES
+                   & ~fitz.TEXT_PRESERVE_LIGATURES)
+except AttributeError:
+    # Older PyMuPDF without the flag constants
+    _TEXT_FLAGS = None
+
+def _page_text(page) -> str:
+    """Extract plain text from a page with the cheap flag set"""
+    if _TEXT_FLAGS is not None:
+        return page.get_text("text", flags=_TEXT_FLAGS)
+    return page.get_text()
+
 class PDFProcessor:
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
 
+    _DOC_CACHE_DIR = "cache/pdf_docs"
+
     def process_pdf(self, pdf_path: str, max_workers: int = 4) -> List[Document]:
         import fitz  # PyMuPDF
         if not os.path.exists(pdf_path):
             logger.error(f"PDF file not found: {pdf_path}")
             return []
+
+        # Unchanged PDFs (same path, mtime and size) skip extraction and
+        # chunking entirely and return the cached Document list
+        cache_key = hashlib.blake2b(
+            f"{pdf_path}:{os.path.getmtime(pdf_path)}:{os.path.getsize(pdf_path)}".encode(),
+            digest_size=16
+        ).hexdigest()
+        cache_file = os.path.join(self._DOC_CACHE_DIR, f"{cache_key}.pkl")
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, "rb") as f:
+                    return pickle.load(f)
+            except Exception as e:
+                logger.warning(f"Error loading PDF document cache: {str(e)}")
+
         doc_id = os.path.basename(pdf_path)
-        pdf_document = fitz.open(pdf_path)
+        pdf_document = _open_pdf(pdf_path)
         total_pages = len(pdf_document)
         if total_pages <= 10:
-            return self._process_pdf_sequential(pdf_document, doc_id, pdf_path)
-        return self._process_pdf_multithreaded(pdf_document, doc_id, pdf_path, max_workers)
+            documents = self._process_pdf_sequential(pdf_document, doc_id, pdf_path)
+        else:
+            documents = self._process_pdf_multithreaded(pdf_document, doc_id, pdf_path, max_workers)
+
+        # Atomic write so a crash mid-dump never leaves a readable partial
+        try:
+            os.makedirs(self._DOC_CACHE_DIR, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self._DOC_CACHE_DIR, suffix=".pkl")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(documents, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_file)
+        except Exception as e:
+            logger.warning(f"Error saving PDF document cache: {str(e)}")
+
+        return documents
 
     def _process_pdf_sequential(self, pdf_document, doc_id: str, pdf_path: str) -> List[Document]:
         documents = []
         for page_num in range(len(pdf_document)):
             page = pdf_document[page_num]
-            text = page.get_text()
+            text = _page_text(page)
             if not text.strip():
                 continue
             documents.extend(self._chunk_text(text, page_num, doc_id, pdf_path))
         return documents
 
     def _process_pdf_multithreaded(self, pdf_document, doc_id: str, pdf_path: str, max_workers: int) -> List[Document]:
+        # Chunking is pure Python and fitz holds the GIL inconsistently, so
+        # threads gave near-zero parallelism here; worker processes scale
+        # with max_workers. Each worker reopens the PDF by path since fitz
+        # documents can't be shared across processes.
         total_pages = len(pdf_document)
         documents = []
         pages_per_worker = max(1, total_pages // max_workers)
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
             futures = []
             for i in range(0, total_pages, pages_per_worker):
                 start_page = i
                 end_page = min(i + pages_per_worker, total_pages)
                 futures.append(executor.submit(
-                    self._process_page_range, pdf_document, start_page, end_page, doc_id, pdf_path
+                    self._process_page_range, pdf_path, start_page, end_page, doc_id
                 ))
             for future in futures:
                 documents.extend(future.result())
         return documents
 
-    def _process_page_range(self, pdf_document, start_page: int, end_page: int, doc_id: str, pdf_path: str) -> List[Document]:
+    def _process_page_range(self, pdf_path: str, start_page: int, end_page: int, doc_id: str) -> List[Document]:
         page_documents = []
-        for page_num in range(start_page, end_page):
-            page = pdf_document[page_num]
-            text = page.get_text()
-            if not text.strip():
-                continue
-            page_documents.extend(self._chunk_text(text, page_num, doc_id, pdf_path))
+        with fitz.open(pdf_path) as pdf_document:
+            for page_num in range(start_page, end_page):
+                page = pdf_document[page_num]
+                text = _page_text(page)
+                if not text.strip():
+                    continue
+                page_documents.extend(self._chunk_text(text, page_num, doc_id, pdf_path))
         return page_documents
 
     def _chunk_text(self, text: str, page_num: int, doc_id: str, pdf_path: str) -> List[Document]:
+        # Precompute all chunk start offsets at once; the loop stops after
+        # the chunk that reaches the end of the text, so the old stride's
+        # trailing tiny/duplicate chunks (each costing an embedding call
+        # downstream) are no longer produced
+        starts = np.arange(0, max(len(text), 1), self.chunk_size - self.chunk_overlap)
         chunks = []
-        for i in range(0, len(text), self.chunk_size - self.chunk_overlap):
-            chunk_text = text[i:i + self.chunk_size]
-            if not chunk_text.strip():
-                continue
-            chunk_id = f"{doc_id}_p{page_num}_c{i//self.chunk_size}"
-            metadata = {
-                "source": pdf_path,
-                "page": page_num,
-                "chunk": i // self.chunk_size,
-                "id": chunk_id,
-                "document_id": doc_id
-            }
-            doc = Document(page_content=chunk_text, metadata=metadata)
-            chunks.append(doc)
+        for i in starts.tolist():
+            end = i + self.chunk_size
+            if end < len(text):
+                # Snap the cut to the last space in the final 64 chars so
+                # chunks don't end mid-word
+                snap = text.rfind(' ', max(i, end - 64), end)
+                if snap > i:
+                    end = snap
+            chunk_text = text[i:end]
+            if chunk_text.strip():
+                chunk_index = i // self.chunk_size
+                chunks.append(Document(
+                    page_content=chunk_text,
+                    metadata={
+                        "source": pdf_path,
+                        "page": page_num,
+                        "chunk": chunk_index,
+                        "id": f"{doc_id}_p{page_num}_c{chunk_index}",
+                        "document_id": doc_id
+                    }
+                ))
+            if i + self.chunk_size >= len(text):
+                break
         return chunks
 
 class EmbeddingManager:
+    """Embedding generation with a memory-mapped on-disk cache.
+
+    Vectors live in one contiguous int8 file read through np.memmap and a
+    small JSON index maps cache key to row. Appending new embeddings is
+    O(new rows) — the old pickle cache reserialized the entire dict on
+    every write. Rows are L2-normalized then scalar-quantized to int8
+    (scale 1/127), quartering cache size versus float32; lookups
+    dequantize back to float32.
+    """
+
+    _QUANT_SCALE = 127.0
+
     def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", cache_dir: str = "cache/embeddings"):
         self.model_name = model_name
         self.cache_dir = cache_dir
         os.makedirs(self.cache_dir, exist_ok=True)
-        self.embedding_model = HuggingFaceEmbeddings(model_name=model_name, cache_folder=cache_dir)
-        self._cache = {}
+        self.embedding_model = HuggingFaceEmbeddings(
+            model_name=model_name, cache_folder=cache_dir,
+            model_kwargs={"device": detect_device()}
+        )
+        self._index = {}
+        self._vectors = None
+        self._dim = None
+        # Index writes are debounced: the JSON rewrite costs O(total keys),
+        # so it runs every _dirty_threshold new entries and at exit rather
+        # than after every batch
+        self._dirty_count = 0
+        self._dirty_threshold = 128
         self._load_cache()
+        atexit.register(self.flush)
+
+    def _vectors_file(self) -> str:
+        return os.path.join(self.cache_dir, "embedding_vectors.i8")
+
+    def _index_file(self) -> str:
+        return os.path.join(self.cache_dir, "embedding_index.json")
 
     def _load_cache(self) -> None:
-        cache_file = os.path.join(self.cache_dir, "embedding_cache.pkl")
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, "rb") as f:
-                    self._cache = pickle.load(f)
-            except Exception as e:
-                logger.error(f"Error loading embedding cache: {str(e)}")
-                self._cache = {}
+        if not (os.path.exists(self._index_file()) and os.path.exists(self._vectors_file())):
+            return
+        try:
+            with open(self._index_file(), "r") as f:
+                meta = json.load(f)
+            self._dim = meta["dim"]
+            self._index = meta["keys"]
+            # Drop orphan rows left by a run that appended vectors but died
+            # before its debounced index flush
+            expected = len(self._index) * self._dim
+            if os.path.getsize(self._vectors_file()) > expected:
+                os.truncate(self._vectors_file(), expected)
+            if self._index:
+                # Read-only mapping: rows are paged in on demand
+                self._vectors = np.memmap(
+                    self._vectors_file(), dtype=np.int8, mode="r",
+                    shape=(len(self._index), self._dim)
+                )
+        except Exception as e:
+            logger.error(f"Error loading embedding cache: {str(e)}")
+            self._index = {}
+            self._vectors = None
+            self._dim = None
+
+    def _append_cache(self, keys: List[str], vectors: np.ndarray) -> None:
+        """Append new rows to the vector file and update the key index.
+
+        Rows are expected unit-norm (generate_embeddings normalizes them),
+        which bounds every component by 1 so one fixed int8 scale covers
+        all vectors.
+        """
+        try:
+            vectors = np.asarray(vectors, dtype=np.float32)
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+            # A batch can contain the same text twice (and a key may already
+            # be cached); writing one row per occurrence while the index
+            # keeps one entry per key would shift every later row mapping
+            fresh_keys = []
+            fresh_rows = []
+            seen = set()
+            for row, key in enumerate(keys):
+                if key in self._index or key in seen:
+                    continue
+                seen.add(key)
+                fresh_keys.append(key)
+                fresh_rows.append(row)
+            if not fresh_keys:
+                return
+            quantized = np.clip(
+                np.round(vectors[fresh_rows] * self._QUANT_SCALE), -127, 127
+            ).astype(np.int8)
+            # Physical rows already in the file are the source of truth for
+            # where the appended rows land; len(self._index) can lag it
+            next_row = 0
+            if os.path.exists(self._vectors_file()):
+                next_row = os.path.getsize(self._vectors_file()) // self._dim
+            with open(self._vectors_file(), "ab") as f:
+                f.write(np.ascontiguousarray(quantized).tobytes())
+            for offset, key in enumerate(fresh_keys):
+                self._index[key] = next_row + offset
+            # Remap to cover the appended rows
+            self._vectors = np.memmap(
+                self._vectors_file(), dtype=np.int8, mode="r",
+                shape=(next_row + len(fresh_keys), self._dim)
+            )
+            self._dirty_count += len(fresh_keys)
+            if self._dirty_count >= self._dirty_threshold:
+                self.flush()
+        except Exception as e:
+            logger.error(f"Error saving embedding cache: {str(e)}")
 
-    def _save_cache(self) -> None:
-        if not self._cache:
+    def flush(self) -> None:
+        """Write the key index to disk atomically if it has unsaved entries."""
+        if not self._dirty_count:
             return
-        cache_file = os.path.join(self.cache_dir, "embedding_cache.pkl")
         try:
-            with open(cache_file, "wb") as f:
-                pickle.dump(self._cache, f)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".json")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"dim": self._dim, "keys": self._index}, f)
+            os.replace(tmp_path, self._index_file())
+            self._dirty_count = 0
         except Exception as e:
             logger.error(f"Error saving embedding cache: {str(e)}")
 
+    async def _embed_batches_async(self, texts: List[str], batch_size: int = 64, max_concurrency: int = 4) -> List[List[float]]:
+        """Embed texts as concurrent bounded batches.
+
+        Slices are dispatched to the default executor under a semaphore so
+        several model invocations pipeline instead of one monolithic call
+        blocking the caller; results come back in input order.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def embed(batch):
+            async with semaphore:
+                return await loop.run_in_executor(
+                    None, self.embedding_model.embed_documents, batch
+                )
+
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results = await asyncio.gather(*(embed(batch) for batch in batches))
+        return [embedding for batch in results for embedding in batch]
+
     def _get_cache_key(self, text: str) -> str:
-        return hashlib.md5(text.encode("utf-8")).hexdigest()
+        # BLAKE3 (SIMD tree hash) when installed; SHA-256 otherwise, which
+        # OpenSSL dispatches to SHA-NI instructions where the CPU has them
+        data = text.encode("utf-8")
+        if blake3 is not None:
+            return blake3.blake3(data).hexdigest(length=16)
+        return hashlib.sha256(data).hexdigest()
 
     def generate_embeddings(self, texts: Union[str, List[str]], use_cache: bool = True) -> List[List[float]]:
         if isinstance(texts, str):
@@ -543,33 +881,58 @@ class EmbeddingManager:
         uncached_texts = []
         uncached_indices = []
         
-        # Get cached embeddings
+        # Get cached embeddings (memmap rows are materialized lazily)
         if use_cache:
             for i, text in enumerate(cleaned_texts):
                 cache_key = self._get_cache_key(text)
-                if cache_key in self._cache:
-                    embeddings[i] = self._cache[cache_key]
+                row = self._index.get(cache_key)
+                if row is not None and self._vectors is not None:
+                    # Dequantize the int8 row back to unit-norm float32
+                    embeddings[i] = (
+                        np.asarray(self._vectors[row], dtype=np.float32)
+                        / self._QUANT_SCALE
+                    )
                 else:
                     uncached_texts.append(text)
                     uncached_indices.append(i)
         else:
             uncached_texts = cleaned_texts
             uncached_indices = list(range(len(cleaned_texts)))
-        
+
         # Generate embeddings for uncached texts
         if uncached_texts:
             try:
-                batch_embeddings = self.embedding_model.embed_documents(uncached_texts)
-                
-                # Update cache and results
+                # Smart batching: length-sorted inputs keep each padded
+                # batch nearly homogeneous, so the model wastes far fewer
+                # FLOPs on padding tokens
+                order = sorted(range(len(uncached_texts)), key=lambda i: len(uncached_texts[i]))
+                sorted_texts = [uncached_texts[i] for i in order]
+
+                # Fan large workloads out as concurrent batches; a single
+                # batch isn't worth the event-loop setup
+                if len(sorted_texts) > 64:
+                    sorted_embeddings = asyncio.run(
+                        self._embed_batches_async(sorted_texts)
+                    )
+                else:
+                    sorted_embeddings = self.embedding_model.embed_documents(sorted_texts)
+
+                # Undo the length sort, normalizing in one vectorized pass
+                # so every embedding this class hands out (fresh or cached)
+                # is unit-norm and cosine similarity downstream reduces to
+                # a plain dot product
+                arr = np.asarray(sorted_embeddings, dtype=np.float32)
+                arr = arr / (np.linalg.norm(arr, axis=1, keepdims=True) + 1e-12)
+                batch_embeddings = [None] * len(order)
+                for pos, src in enumerate(order):
+                    batch_embeddings[src] = arr[pos]
+
                 for idx, embedding in zip(uncached_indices, batch_embeddings):
-                    if use_cache:
-                        cache_key = self._get_cache_key(cleaned_texts[idx])
-                        self._cache[cache_key] = embedding
                     embeddings[idx] = embedding
-                    
+
                 if use_cache:
-                    self._save_cache()
+                    new_keys = [self._get_cache_key(cleaned_texts[i]) for i in uncached_indices]
+                    self._append_cache(new_keys, np.asarray(batch_embeddings))
             except Exception as e:
                 logger.error(f"Error generating embeddings: {str(e)}")
                 dim = 384  # Default dimension
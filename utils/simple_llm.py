@@ -2,55 +2,236 @@
 Simple LLM implementation using HuggingFace API
 """
 import os
+import re
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter, Retry
 import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
 
 logger = logging.getLogger(__name__)
 
+class _SemanticCache:
+    """Response cache keyed on prompt meaning, not just exact text.
+
+    Exact repeats hit an LRU dict; near-identical prompts (reworded
+    questions, whitespace differences surviving templating) hit a small
+    inner-product index over normalized prompt embeddings and return the
+    stored response when top-1 similarity clears the threshold, skipping
+    the network call and upstream inference entirely.
+    """
+
+    def __init__(self, dimension=384, max_entries=1000, threshold=0.95):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._exact = OrderedDict()
+        self._responses = []
+        self._embeddings = []
+        self._index = faiss.IndexFlatIP(dimension) if faiss is not None else None
+        self._lock = threading.RLock()
+
+    def _embed(self, prompt):
+        """Unit-norm prompt embedding as a (1, d) float32 row"""
+        from utils.embeddings import generate_query_embedding
+        vec = np.ascontiguousarray(
+            [generate_query_embedding(prompt)], dtype='float32'
+        )
+        faiss.normalize_L2(vec)
+        return vec
+
+    def get(self, prompt):
+        with self._lock:
+            cached = self._exact.get(prompt)
+            if cached is not None:
+                self._exact.move_to_end(prompt)
+                return cached
+            if self._index is None or self._index.ntotal == 0:
+                return None
+        try:
+            vec = self._embed(prompt)
+        except Exception as e:
+            logger.debug(f"Semantic cache lookup skipped: {str(e)}")
+            return None
+        with self._lock:
+            if self._index.ntotal == 0:
+                return None
+            sims, indices = self._index.search(vec, 1)
+            if sims[0][0] >= self.threshold:
+                return self._responses[indices[0][0]]
+        return None
+
+    def put(self, prompt, response):
+        with self._lock:
+            self._exact[prompt] = response
+            if len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+        if self._index is None:
+            return
+        try:
+            vec = self._embed(prompt)
+        except Exception as e:
+            logger.debug(f"Semantic cache insert skipped: {str(e)}")
+            return
+        with self._lock:
+            self._responses.append(response)
+            self._embeddings.append(vec)
+            self._index.add(vec)
+            if len(self._responses) > self.max_entries:
+                # FIFO eviction; flat indexes can't drop rows in place, so
+                # rebuild from the surviving embeddings (cheap at this size)
+                self._responses.pop(0)
+                self._embeddings.pop(0)
+                self._index.reset()
+                self._index.add(np.vstack(self._embeddings))
+
 class SimpleLLM:
     """Simple LLM using HuggingFace Inference API"""
-    
+
     def __init__(self):
         self.api_key = os.getenv("HUGGINGFACE_API_KEY")
+        # Key validity never changes after construction, so evaluate the
+        # string comparisons once instead of on every invoke
+        self._api_key_valid = bool(self.api_key) and \
+            self.api_key != "your-huggingface-api-key-here"
         self.api_url = "https://api-inference.huggingface.co/models/google/flan-t5-base"
         self.headers = {"Authorization": f"Bearer {self.api_key}"}
-    
+        # Constant part of every request body; _build_payload only adds
+        # the prompt
+        self._base_payload = {
+            "parameters": {
+                "max_new_tokens": 200,
+                "temperature": 0.7,
+                "do_sample": True
+            }
+        }
+        # Pooled session: keep-alive skips the TCP+TLS handshake on every
+        # call, and transient upstream errors retry with backoff
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=10, pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.3,
+                              status_forcelist=[429, 500, 502, 503, 504])
+        ))
+        # httpx client for ainvoke, created lazily and keyed on the event
+        # loop it was made under
+        self._aclient = None
+        self._aclient_loop = None
+        # Answers served from here skip the API round trip entirely
+        self._response_cache = _SemanticCache()
+
+    def _build_payload(self, prompt):
+        """Request payload shared by the sync and async paths"""
+        return {"inputs": prompt, **self._base_payload}
+
+    def _parse_result(self, prompt, result):
+        """Extract the generated text from an API response body"""
+        if isinstance(result, list) and len(result) > 0:
+            return result[0].get("generated_text", "").replace(prompt, "").strip()
+        return str(result)
+
     def invoke(self, prompt):
         """Generate response for the given prompt"""
         try:
-            if not self.api_key or self.api_key == "your-huggingface-api-key-here":
+            if not self._api_key_valid:
                 return self._fallback_response(prompt)
-            
-            payload = {
-                "inputs": prompt,
-                "parameters": {
-                    "max_new_tokens": 200,
-                    "temperature": 0.7,
-                    "do_sample": True
-                }
-            }
-            
-            response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=30)
-            
+
+            cached = self._response_cache.get(prompt)
+            if cached is not None:
+                return cached
+
+            response = self.session.post(
+                self.api_url, json=self._build_payload(prompt), timeout=30
+            )
+
             if response.status_code == 200:
-                result = response.json()
-                if isinstance(result, list) and len(result) > 0:
-                    return result[0].get("generated_text", "").replace(prompt, "").strip()
-                return str(result)
+                result = self._parse_result(prompt, response.json())
+                self._response_cache.put(prompt, result)
+                return result
             else:
                 logger.warning(f"HuggingFace API error: {response.status_code} - {response.text}")
                 return self._fallback_response(prompt)
-                
+
+        except Exception as e:
+            logger.error(f"Error calling HuggingFace API: {str(e)}")
+            return self._fallback_response(prompt)
+
+    async def ainvoke(self, prompt):
+        """Async variant of invoke.
+
+        Lets callers overlap the LLM call with other network I/O (web
+        search, further retrievals) via asyncio.gather instead of paying
+        for each round trip serially. Requires httpx.
+        """
+        if httpx is None:
+            # No async HTTP stack installed; degrade to the sync path
+            return self.invoke(prompt)
+        try:
+            if not self._api_key_valid:
+                return self._fallback_response(prompt)
+
+            cached = self._response_cache.get(prompt)
+            if cached is not None:
+                return cached
+
+            # Keep-alive connections are bound to the loop that opened
+            # them; after asyncio.run closes its loop, reusing the cached
+            # client fails with "Event loop is closed", so rebuild it
+            # whenever the running loop changes
+            loop = asyncio.get_running_loop()
+            if self._aclient is None or self._aclient_loop is not loop:
+                self._aclient = httpx.AsyncClient(
+                    headers=self.headers,
+                    limits=httpx.Limits(max_connections=20,
+                                        max_keepalive_connections=10)
+                )
+                self._aclient_loop = loop
+            response = await self._aclient.post(
+                self.api_url, json=self._build_payload(prompt), timeout=30
+            )
+
+            if response.status_code == 200:
+                result = self._parse_result(prompt, response.json())
+                self._response_cache.put(prompt, result)
+                return result
+            logger.warning(f"HuggingFace API error: {response.status_code} - {response.text}")
+            return self._fallback_response(prompt)
         except Exception as e:
             logger.error(f"Error calling HuggingFace API: {str(e)}")
             return self._fallback_response(prompt)
     
     def _fallback_response(self, prompt):
         """Provide a helpful fallback response with clean formatting (no # or * symbols)"""
-        prompt_lower = prompt.lower()
-        
-        if "complexity" in prompt_lower:
-            return """Algorithm Complexity
+        # One regex pass over the prompt instead of a .lower() copy plus a
+        # linear substring scan per branch; priority order matches the old
+        # if/elif chain. Keywords are matched as prefixes so inflected
+        # forms ("sorting", "algorithms") route like the old substring
+        # checks did
+        found = {m.lower() for m in _FALLBACK_RE.findall(prompt)}
+        for keyword in ('complexity', 'sort', 'algorithm'):
+            if keyword in found:
+                return _FALLBACK_RESPONSES[keyword]
+        return _FALLBACK_DEFAULT
+
+    def __call__(self, prompt):
+        """Allow the object to be called like a function"""
+        return self.invoke(prompt)
+
+# Static fallback bodies, allocated once at import instead of per call
+_COMPLEXITY_TEXT = """Algorithm Complexity
 
 Algorithm complexity refers to the computational resources required by an algorithm.
 
@@ -72,9 +253,8 @@ Big O Notation:
 • O(n²) - Quadratic time
 
 For detailed analysis, please upload relevant algorithm textbooks or materials."""
-        
-        elif any(word in prompt_lower for word in ["sort", "sorting"]):
-            return """Sorting Algorithms
+
+_SORTING_TEXT = """Sorting Algorithms
 
 Sorting algorithms arrange data in a particular order (ascending or descending).
 
@@ -105,9 +285,8 @@ Common Sorting Algorithms:
 • Uses heap data structure
 
 Upload algorithm textbooks for detailed implementations and analysis."""
-        
-        elif "algorithm" in prompt_lower:
-            return """Algorithm Definition
+
+_ALGORITHM_TEXT = """Algorithm Definition
 
 An algorithm is a finite sequence of well-defined instructions for solving a computational problem or performing a task.
 
@@ -132,9 +311,8 @@ Importance:
 Algorithms are fundamental to computer science and programming, serving as the blueprint for solving problems systematically and efficiently.
 
 Note: This is a general definition. For more specific information, please upload relevant PDF documents."""
-        
-        else:
-            return """AI Assistant Response
+
+_FALLBACK_DEFAULT = """AI Assistant Response
 
 I can provide detailed information based on your uploaded PDF documents. 
 
@@ -149,7 +327,12 @@ Current capabilities:
 • Content search and retrieval
 
 Please ensure your HuggingFace API key is properly configured for enhanced AI responses."""
-    
-    def __call__(self, prompt):
-        """Allow the object to be called like a function"""
-        return self.invoke(prompt)
+
+_FALLBACK_RESPONSES = {
+    'complexity': _COMPLEXITY_TEXT,
+    'sort': _SORTING_TEXT,
+    'algorithm': _ALGORITHM_TEXT,
+}
+# No trailing \b: "sorting"/"sorts"/"algorithms" must match like the old
+# substring checks
+_FALLBACK_RE = re.compile(r'\b(complexity|sort|algorithm)', re.IGNORECASE)
@@ -1,27 +1,314 @@
 import faiss
 import numpy as np
 import os
+import atexit
 import pickle
 import json
+import time
 import logging
+import hashlib
+import threading
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _squared_l2_distances(matrix, query):
+        """Parallel squared-L2 distances between each row of matrix and query.
+
+        prange spreads rows across cores and fastmath lets LLVM auto-vectorize
+        the inner fused multiply-adds (AVX2 on x86).
+        """
+        n, d = matrix.shape
+        out = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            acc = 0.0
+            for j in range(d):
+                diff = matrix[i, j] - query[j]
+                acc += diff * diff
+            out[i] = acc
+        return out
+
 class VectorStore:
     """
     A vector store implementation using FAISS
     """
     
-    def __init__(self, dimension=384, store_path='./data/vector_store.pkl'):  # default dimension for 'all-MiniLM-L6-v2'
+    def __init__(self, dimension=384, store_path='./data/vector_store.pkl',
+                 index_type=None, nprobe=8, train_threshold=10000):  # default dimension for 'all-MiniLM-L6-v2'
         self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)
+        self.index_type = index_type or os.getenv('VECTOR_INDEX_TYPE', 'flat')
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self._pending_vectors = []  # Buffered vectors while an IVF index is untrained
+        # The ID map lets remove_document drop a document's vectors from
+        # the index instead of leaving ghost rows that every search scans
+        self.index = self._maybe_to_gpu(
+            faiss.IndexIDMap2(self._build_index(self.index_type))
+        )
         self.documents = {}  # doc_id -> {chunks, metadata}
-        self.doc_ids = []  # To maintain the order of documents
+        # Chunk->document mapping stored structure-of-arrays style: a uint32
+        # row index per chunk into a small table of unique doc ids, instead
+        # of one Python string reference per chunk
+        self._doc_id_idx = np.empty(0, dtype=np.uint32)
+        self._doc_id_table = []
+        self._doc_arrays_cache = None  # Rebuilt lazily by _doc_arrays()
+        # Content-keyed pool deduplicating identical chunk texts across
+        # documents (re-uploads, repeated boilerplate pages)
+        self._chunk_pool = {}  # blake2b-16 digest -> chunk text
+        self._chunk_refs = {}  # digest -> number of referencing documents
         self.store_path = store_path
+        self._version = 0  # Bumped on every mutation, used for cache invalidation
+        # Full snapshots (index + metadata) are written every _save_interval
+        # documents and at exit; in between, add_document appends one JSON
+        # line of metadata per document instead of reserializing everything
+        self._save_interval = 16
+        self._docs_since_save = 0
         self._ensure_directory_exists()
         self.load()
-        
+        # Snapshots run on a background thread so add/remove return without
+        # waiting on disk; the dirty flag coalesces bursts of mutations.
+        # The lock serializes mutations against save(): faiss index writes
+        # racing concurrent add/remove are not thread-safe, and the
+        # metadata must not change size mid-serialization
+        self._store_lock = threading.RLock()
+        self._dirty = threading.Event()
+        self._flush_delay = 5.0
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop, daemon=True, name='vector-store-flush'
+        )
+        self._flush_thread.start()
+        atexit.register(self.save)
+
+    def _flush_loop(self):
+        """Write a snapshot whenever the store has been marked dirty.
+
+        The post-wakeup sleep lets a burst of uploads settle so one
+        snapshot covers all of them; clearing the flag before saving means
+        mutations that land mid-save re-mark the store dirty.
+        """
+        while True:
+            self._dirty.wait()
+            time.sleep(self._flush_delay)
+            self._dirty.clear()
+            self.save()
+
+    def _build_index(self, index_type):
+        """Build a FAISS index of the configured type.
+
+        'flat' is exact brute-force search (O(n) per query). 'hnsw' and
+        'ivfpq' trade <1% recall for sub-linear search once the corpus grows
+        beyond a few thousand chunks; 'ivfpq' additionally compresses stored
+        vectors with product quantization.
+        """
+        if index_type == 'hnsw':
+            # Graph search is O(log n) per query and supports incremental
+            # add() without training; ef knobs trade recall for speed
+            index = faiss.IndexHNSWFlat(self.dimension, 32)
+            index.hnsw.efConstruction = 40
+            index.hnsw.efSearch = 64
+            return index
+        if index_type == 'ivfpq':
+            # Cosine similarity as inner product over L2-normalized vectors;
+            # PQ codes shrink resident memory ~8-32x versus float32 and cut
+            # per-query comparisons to nlist + nprobe*N/nlist
+            index = faiss.index_factory(
+                self.dimension, 'IVF1024,PQ32x8', faiss.METRIC_INNER_PRODUCT
+            )
+            index.nprobe = self.nprobe
+            return index
+        # Default: exact search over fp16-quantized vectors, halving index
+        # memory and bandwidth versus IndexFlatL2's float32 storage. Inner
+        # product over the L2-normalized embeddings ranks by cosine
+        # similarity and skips the subtract in every distance computation
+        return faiss.IndexScalarQuantizer(
+            self.dimension, faiss.ScalarQuantizer.QT_fp16,
+            faiss.METRIC_INNER_PRODUCT
+        )
+
+    def _ensure_trained(self, embeddings_np):
+        """Train an IVF index once enough vectors have accumulated.
+
+        Untrained IVF indexes cannot accept vectors, so incoming embeddings
+        are buffered (and brute-force searched) until train_threshold is
+        reached, then used as the training sample and flushed into the index.
+        """
+        if self._uses_inner_product():
+            # Unit vectors turn inner product into cosine similarity.
+            # normalize_L2 works in place, and since the add paths avoid
+            # copying contiguous float32 input, normalize a private copy
+            # so caller-owned (possibly read-only) arrays are never mutated
+            embeddings_np = np.array(embeddings_np)
+            faiss.normalize_L2(embeddings_np)
+
+        if self.index.is_trained:
+            # Row ids continue the chunk numbering tracked in _doc_id_idx
+            start = len(self._doc_id_idx)
+            self._add_vectors(
+                embeddings_np,
+                np.arange(start, start + len(embeddings_np), dtype=np.int64)
+            )
+            return
+
+        self._pending_vectors.append(embeddings_np)
+        total = sum(len(v) for v in self._pending_vectors)
+        if total >= self.train_threshold:
+            # Buffering only ever happens from an empty index, so the
+            # buffered rows are exactly global rows 0..total-1
+            training_data = np.vstack(self._pending_vectors)
+            self.index.train(training_data)
+            self._add_vectors(training_data, np.arange(total, dtype=np.int64))
+            self._pending_vectors = []
+            logger.info(f"Trained {self.index_type} index on {total} vectors")
+
+    def _add_vectors(self, embeddings_np, ids):
+        """Add vectors under explicit ids, tolerating legacy plain indexes."""
+        try:
+            self.index.add_with_ids(embeddings_np, ids)
+        except RuntimeError:
+            # Pre-IDMap index loaded from an old store: sequential implicit
+            # ids match our numbering, so plain add keeps mappings correct
+            self.index.add(embeddings_np)
+
+    def _append_doc_ids(self, document_id, count):
+        """Record count chunk-to-document mappings for document_id"""
+        new_idx = len(self._doc_id_table)
+        self._doc_id_table.append(document_id)
+        self._doc_id_idx = np.concatenate([
+            self._doc_id_idx, np.full(count, new_idx, dtype=np.uint32)
+        ])
+
+    def _doc_id_for(self, idx):
+        """Resolve a FAISS row index to its document id"""
+        return self._doc_id_table[self._doc_id_idx[idx]]
+
+    def _doc_arrays(self):
+        """Per-table-entry (chunk_start, chunk_count, alive) numpy arrays.
+
+        These let search validate a whole result row with array arithmetic
+        instead of per-hit dict lookups. Rebuilt lazily after mutations;
+        the rebuild is O(number of documents), which is tiny next to the
+        per-chunk work it replaces.
+        """
+        key = (self._version, len(self._doc_id_table))
+        if self._doc_arrays_cache is None or self._doc_arrays_cache[0] != key:
+            n = len(self._doc_id_table)
+            starts = np.zeros(n, dtype=np.int64)
+            lengths = np.zeros(n, dtype=np.int64)
+            alive = np.zeros(n, dtype=bool)
+            for i, doc_id in enumerate(self._doc_id_table):
+                doc_info = self.documents.get(doc_id)
+                if doc_info is not None:
+                    starts[i] = doc_info.get('chunk_start_idx', 0)
+                    lengths[i] = len(doc_info.get('chunks', []))
+                    alive[i] = True
+            self._doc_arrays_cache = (key, starts, lengths, alive)
+        return self._doc_arrays_cache[1:]
+
+    def _format_hits(self, idx_arr, dist_arr, threshold):
+        """Turn one row of FAISS results into the result-dict list.
+
+        All validity checks (stale rows, removed documents, out-of-range
+        chunk offsets, threshold) run as vectorized boolean masks; Python
+        only loops over the survivors to build the dicts.
+        """
+        starts, lengths, alive = self._doc_arrays()
+        valid = (idx_arr >= 0) & (idx_arr < len(self._doc_id_idx))
+        idx_arr = idx_arr[valid]
+        dist_arr = dist_arr[valid]
+        doc_idx = self._doc_id_idx[idx_arr].astype(np.int64)
+        relative = idx_arr - starts[doc_idx]
+        keep = alive[doc_idx] & (relative >= 0) & (relative < lengths[doc_idx])
+        if threshold is not None:
+            # Inner-product scores are similarities (higher is better);
+            # L2 scores are distances (lower is better)
+            if self._uses_inner_product():
+                keep &= dist_arr >= threshold
+            else:
+                keep &= dist_arr <= threshold
+        results = []
+        for d, r, score in zip(doc_idx[keep].tolist(), relative[keep].tolist(),
+                               dist_arr[keep].tolist()):
+            doc_id = self._doc_id_table[d]
+            results.append({
+                'doc_id': doc_id,
+                'chunk': self.documents[doc_id]['chunks'][r],
+                'score': float(score)
+            })
+        return results
+
+    def _intern_chunks(self, chunks):
+        """Deduplicate chunk texts through the content-keyed pool.
+
+        Documents keep references to the pooled string objects, so every
+        byte-identical chunk is resident exactly once regardless of how
+        many documents contain it; the on-disk formats are unchanged.
+        """
+        interned = []
+        for chunk in chunks:
+            key = hashlib.blake2b(chunk.encode('utf-8'), digest_size=16).digest()
+            pooled = self._chunk_pool.get(key)
+            if pooled is None:
+                self._chunk_pool[key] = pooled = chunk
+                self._chunk_refs[key] = 0
+            self._chunk_refs[key] += 1
+            interned.append(pooled)
+        return interned
+
+    def _release_chunks(self, chunks):
+        """Drop pool entries whose last referencing document was removed."""
+        for chunk in chunks:
+            key = hashlib.blake2b(chunk.encode('utf-8'), digest_size=16).digest()
+            refs = self._chunk_refs.get(key)
+            if refs is None:
+                continue
+            if refs <= 1:
+                del self._chunk_refs[key]
+                del self._chunk_pool[key]
+            else:
+                self._chunk_refs[key] = refs - 1
+
+    def _uses_inner_product(self):
+        """Whether the index ranks by inner product (cosine on unit vectors)"""
+        return getattr(self.index, 'metric_type', None) == faiss.METRIC_INNER_PRODUCT
+
+    def _maybe_to_gpu(self, index):
+        """Move an index to GPU(s) when a GPU build of faiss is available.
+
+        GPU k-NN search is 5-25x faster on moderate corpora; on the common
+        faiss-cpu install this is a no-op.
+        """
+        self._on_gpu = False
+        if hasattr(faiss, 'get_num_gpus') and faiss.get_num_gpus() > 0:
+            try:
+                gpu_index = faiss.index_cpu_to_all_gpus(index)
+                self._on_gpu = True
+                logger.info(f"FAISS index moved to {faiss.get_num_gpus()} GPU(s)")
+                return gpu_index
+            except Exception as e:
+                logger.warning(f"Failed to move FAISS index to GPU: {str(e)}")
+        return index
+
+    def _to_cpu(self, index):
+        """Bring a (possibly GPU-resident) index back to CPU for serialization."""
+        if self._on_gpu:
+            try:
+                return faiss.index_gpu_to_cpu(index)
+            except Exception as e:
+                logger.warning(f"Failed to move FAISS index back to CPU: {str(e)}")
+        return index
+
     def _ensure_directory_exists(self):
         """Create directory for the vector store if it doesn't exist."""
         directory = os.path.dirname(self.store_path)
@@ -40,21 +327,24 @@ class VectorStore:
         """
         chunks = embedding_data['chunks']
         embeddings = embedding_data['embeddings']
-        
-        # Store document info
-        self.documents[doc_id] = {
-            'text': text,
-            'chunks': chunks,
-            'chunk_start_idx': len(self.doc_ids)
-        }
-        
-        # Add embeddings to FAISS index
-        embeddings_np = np.array(embeddings).astype('float32')
-        self.index.add(embeddings_np)
-        
-        # Track document IDs for each embedding
-        for _ in range(len(chunks)):
-            self.doc_ids.append(doc_id)
+
+        with self._store_lock:
+            # Store document info
+            self.documents[doc_id] = {
+                'text': text,
+                'chunks': self._intern_chunks(chunks),
+                'chunk_start_idx': len(self._doc_id_idx)
+            }
+
+            # Add embeddings to FAISS index; asarray skips the copy when the
+            # caller already hands us contiguous float32
+            embeddings_np = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+            assert embeddings_np.shape[1] == self.dimension, \
+                f"Expected dimension {self.dimension}, got {embeddings_np.shape[1]}"
+            self._ensure_trained(embeddings_np)
+
+            # Track document IDs for each embedding
+            self._append_doc_ids(doc_id, len(chunks))
     
     def search(self, query_embedding, top_k=5, threshold=None):
         """
@@ -67,43 +357,73 @@ class VectorStore:
         Returns:
             list: List of (doc_id, chunk_text, similarity_score) tuples
         """
-        # Format query embedding
-        query_embedding = np.array([query_embedding]).astype('float32')
-        
-        # Handle empty index case
-        if self.index.ntotal == 0:
+        # Format query embedding (contiguous float32, as faiss expects)
+        query_embedding = np.ascontiguousarray([query_embedding], dtype='float32')
+        if self._uses_inner_product():
+            faiss.normalize_L2(query_embedding)
+
+        if self._pending_vectors:
+            # IVF index not trained yet: brute-force over the buffered vectors
+            matrix = np.vstack(self._pending_vectors)
+            if self._uses_inner_product():
+                # Buffer and query are already unit-norm, so one matvec
+                # yields the same cosine scores (and threshold direction)
+                # the trained index will return
+                scores = matrix @ query_embedding[0]
+                order = np.argsort(-scores)
+            else:
+                if njit is not None:
+                    scores = _squared_l2_distances(
+                        np.ascontiguousarray(matrix, dtype='float32'),
+                        query_embedding[0]
+                    )
+                else:
+                    scores = ((matrix - query_embedding) ** 2).sum(axis=1)
+                order = np.argsort(scores)
+            order = order[:min(top_k, len(matrix))]
+            distances = scores[order][np.newaxis, :]
+            indices = order[np.newaxis, :]
+        elif self.index.ntotal == 0:
+            # Handle empty index case
             return []
-            
-        # Search the index
-        distances, indices = self.index.search(query_embedding, min(top_k, self.index.ntotal))
-        
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < 0 or idx >= len(self.doc_ids):
-                continue  # Skip invalid indices
-                
-            doc_id = self.doc_ids[idx]
-            if doc_id not in self.documents:
-                continue  # Skip if document doesn't exist
-                
-            # Calculate relative chunk index with bounds checking
-            relative_idx = idx - self.documents[doc_id]['chunk_start_idx']
-            chunks = self.documents[doc_id]['chunks']
-            
-            if relative_idx < 0 or relative_idx >= len(chunks):
-                continue  # Skip if chunk index is out of range
-                
-            chunk_text = chunks[relative_idx]
-            results.append({
-                'doc_id': doc_id,
-                'chunk': chunk_text,
-                'score': float(distances[0][i])
-            })
-        
-        if threshold is not None:
-            results = [r for r in results if r['score'] <= threshold]
-        return results
+        else:
+            # Search the index
+            distances, indices = self.index.search(query_embedding, min(top_k, self.index.ntotal))
+
+        return self._format_hits(indices[0], distances[0], threshold)
     
+    def search_batch(self, query_embeddings, top_k=5, threshold=None):
+        """
+        Search the vector store for several queries in one FAISS call
+
+        Stacking the queries into a single (n, d) matrix lets FAISS run its
+        batched SIMD distance kernels and pays the Python/FAISS boundary
+        cost once instead of per query.
+
+        Args:
+            query_embeddings: 2D array-like of query embedding vectors
+            top_k: Number of results to return per query
+
+        Returns:
+            list: One result list per query, each shaped like search() output
+        """
+        queries = np.ascontiguousarray(query_embeddings, dtype='float32')
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+        if self._uses_inner_product():
+            faiss.normalize_L2(queries)
+
+        if self._pending_vectors:
+            # Untrained-buffer path: reuse the single-query brute force
+            return [self.search(q, top_k=top_k, threshold=threshold) for q in queries]
+        if self.index.ntotal == 0:
+            return [[] for _ in range(len(queries))]
+
+        distances, indices = self.index.search(queries, min(top_k, self.index.ntotal))
+
+        return [self._format_hits(row_idx, row_dist, threshold)
+                for row_dist, row_idx in zip(distances, indices)]
+
     def similarity_search(self, query_embedding, k=5, threshold=None):
         """
         Alias for search method to maintain compatibility
@@ -117,37 +437,195 @@ class VectorStore:
         """
         return self.search(query_embedding, top_k=k, threshold=threshold)
     
-    def save(self):
-        """Save the vector store to disk."""
+    def _index_path(self):
+        """Path of the standalone FAISS index file next to the pickle"""
+        return self.store_path + '.index'
+
+    def _meta_path(self):
+        """Path of the append-only metadata sidecar next to the snapshot"""
+        return self.store_path + '.meta.jsonl'
+
+    def _snapshot_path(self):
+        """Path of the JSON metadata snapshot (replaces the legacy pickle)"""
+        return self.store_path + '.meta.json'
+
+    def _append_meta(self, document_id):
+        """Append one document's metadata to the JSONL sidecar.
+
+        Costs O(one document) instead of the O(whole store) pickle rewrite;
+        the sidecar is replayed on load and truncated at the next snapshot.
+        """
+        doc_info = self.documents[document_id]
         try:
-            with open(self.store_path, 'wb') as f:
-                pickle.dump({
-                    'documents': self.documents,
-                    'doc_ids': self.doc_ids,
-                    'index': faiss.serialize_index(self.index)
-                }, f)
-            logger.info(f"Vector store saved with {len(self.doc_ids)} entries")
+            with open(self._meta_path(), 'a') as f:
+                f.write(json.dumps({
+                    'doc_id': document_id,
+                    'chunks': doc_info.get('chunks'),
+                    'chunk_start_idx': doc_info.get('chunk_start_idx'),
+                    'filename': doc_info.get('filename'),
+                    'upload_time': doc_info.get('upload_time')
+                }) + '\n')
         except Exception as e:
-            logger.error(f"Failed to save vector store: {str(e)}")
+            logger.error(f"Failed to append vector store metadata: {str(e)}")
+
+    def save(self):
+        """Save the vector store to disk.
+
+        The index goes through faiss.write_index (its native, mmap-able
+        format) and the metadata through JSON -- orjson when installed,
+        which serializes numpy arrays natively and is several times faster
+        than both stdlib json and the pickle snapshot it replaces.
+        """
+        with self._store_lock:
+            try:
+                cpu_index = self._to_cpu(self.index)
+                faiss.write_index(cpu_index, self._index_path())
+                meta = {
+                    'documents': self.documents,
+                    'doc_id_idx': self._doc_id_idx,
+                    'doc_id_table': self._doc_id_table,
+                    'pending_vectors': self._pending_vectors
+                }
+                if orjson is not None:
+                    payload = orjson.dumps(meta, option=orjson.OPT_SERIALIZE_NUMPY)
+                else:
+                    meta['doc_id_idx'] = meta['doc_id_idx'].tolist()
+                    meta['pending_vectors'] = [v.tolist() for v in meta['pending_vectors']]
+                    payload = json.dumps(meta).encode()
+                with open(self._snapshot_path(), 'wb') as f:
+                    f.write(payload)
+                # The snapshot covers everything the sidecar recorded
+                if os.path.exists(self._meta_path()):
+                    os.remove(self._meta_path())
+                self._docs_since_save = 0
+                logger.info(f"Vector store saved with {len(self._doc_id_idx)} entries")
+            except Exception as e:
+                logger.error(f"Failed to save vector store: {str(e)}")
     
+    def _load_index_file(self, pickled_index=None):
+        """Load the FAISS index from its sidecar (or a legacy pickled copy)."""
+        if os.path.exists(self._index_path()) and \
+                os.getenv('VECTOR_INDEX_MMAP', '').lower() in ('1', 'true'):
+            # mmap the index file: pages are shared across forked
+            # workers and only touched pages count towards RSS.
+            # The resulting index is read-only, so this is meant
+            # for query-serving deployments.
+            self.index = faiss.read_index(
+                self._index_path(),
+                faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+            )
+            logger.info("Vector store index mmap-loaded (read-only)")
+        elif os.path.exists(self._index_path()):
+            # Read the sidecar file directly: unlike deserialize_index
+            # over a pickled copy, this never holds index bytes and
+            # index in RAM at once
+            self.index = self._maybe_to_gpu(
+                faiss.read_index(self._index_path())
+            )
+        elif pickled_index is not None:
+            self.index = self._maybe_to_gpu(
+                faiss.deserialize_index(pickled_index)
+            )
+
     def load(self):
-        """Load the vector store from disk."""
-        if os.path.exists(self.store_path):
+        """Load the vector store from disk.
+
+        Prefers the JSON metadata snapshot; stores written before the
+        format change fall back to the pickle.
+        """
+        if os.path.exists(self._snapshot_path()):
+            try:
+                with open(self._snapshot_path(), 'rb') as f:
+                    raw = f.read()
+                data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+                self.documents = data.get('documents', {})
+                self._doc_id_idx = np.asarray(
+                    data.get('doc_id_idx', []), dtype=np.uint32
+                )
+                self._doc_id_table = data.get('doc_id_table', [])
+                self._pending_vectors = [
+                    np.asarray(v, dtype=np.float32)
+                    for v in data.get('pending_vectors', [])
+                ]
+                self._load_index_file()
+                logger.info(f"Vector store loaded with {len(self._doc_id_idx)} entries")
+            except Exception as e:
+                logger.error(f"Failed to load vector store: {str(e)}")                # Initialize empty store on error
+                self.documents = {}
+                self._doc_id_idx = np.empty(0, dtype=np.uint32)
+                self._doc_id_table = []
+        elif os.path.exists(self.store_path):
             try:
                 with open(self.store_path, 'rb') as f:
                     data = pickle.load(f)
                     self.documents = data.get('documents', {})
-                    self.doc_ids = data.get('doc_ids', [])
-                    if 'index' in data:
-                        self.index = faiss.deserialize_index(data['index'])
-                logger.info(f"Vector store loaded with {len(self.doc_ids)} entries")
+                    if 'doc_id_idx' in data:
+                        self._doc_id_idx = data['doc_id_idx']
+                        self._doc_id_table = data['doc_id_table']
+                    else:
+                        # Older stores kept one doc-id string per chunk
+                        for doc_id in data.get('doc_ids', []):
+                            if (not self._doc_id_table
+                                    or self._doc_id_table[-1] != doc_id):
+                                self._doc_id_table.append(doc_id)
+                            self._doc_id_idx = np.append(
+                                self._doc_id_idx,
+                                np.uint32(len(self._doc_id_table) - 1)
+                            )
+                    self._pending_vectors = data.get('pending_vectors', [])
+                    self._load_index_file(pickled_index=data.get('index'))
+                logger.info(f"Vector store loaded with {len(self._doc_id_idx)} entries")
             except Exception as e:
                 logger.error(f"Failed to load vector store: {str(e)}")                # Initialize empty store on error
                 self.documents = {}
-                self.doc_ids = []
+                self._doc_id_idx = np.empty(0, dtype=np.uint32)
+                self._doc_id_table = []
         else:
             logger.info("No vector store found, starting with empty store")
+
+        # Rebuild the chunk dedup pool from the loaded snapshot
+        for doc_info in self.documents.values():
+            doc_info['chunks'] = self._intern_chunks(doc_info.get('chunks', []))
+
+        self._replay_meta()
+
+    def _replay_meta(self):
+        """Re-apply sidecar metadata written after the last full snapshot."""
+        if not os.path.exists(self._meta_path()):
+            return
+        try:
+            with open(self._meta_path(), 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    doc_id = entry['doc_id']
+                    if doc_id in self.documents:
+                        continue
+                    chunks = self._intern_chunks(entry.get('chunks') or [])
+                    self.documents[doc_id] = {
+                        'chunks': chunks,
+                        'chunk_start_idx': entry.get('chunk_start_idx', len(self._doc_id_idx)),
+                        'filename': entry.get('filename', doc_id),
+                        'upload_time': entry.get('upload_time')
+                    }
+                    self._append_doc_ids(doc_id, len(chunks))
+            logger.info("Replayed vector store metadata sidecar")
+        except Exception as e:
+            logger.error(f"Failed to replay vector store metadata: {str(e)}")
     
+    def version(self):
+        """
+        Get the current version of the vector store
+
+        The version is incremented whenever a document is added or removed,
+        so callers can use it to invalidate caches keyed on store contents.
+
+        Returns:
+            int: Current version number
+        """
+        return self._version
+
     def remove_document(self, doc_id):
         """
         Remove a document and its chunks from the vector store
@@ -158,19 +636,40 @@ class VectorStore:
         Returns:
             bool: True if document was removed, False if not found
         """
-        if doc_id not in self.documents:
-            logger.warning(f"Document {doc_id} not found in vector store")
-            return False
-        
-        # Remove from documents dictionary
-        del self.documents[doc_id]
-        
-        # For now, we'll keep the embeddings in the index but mark the document as removed
-        # A complete implementation would rebuild the index, but that's expensive
-        
-        # Save after removal
-        self.save()
-        
+        with self._store_lock:
+            if doc_id not in self.documents:
+                logger.warning(f"Document {doc_id} not found in vector store")
+                return False
+
+            doc_info = self.documents[doc_id]
+
+            # Remove from documents dictionary and release its pooled chunks
+            del self.documents[doc_id]
+            self._release_chunks(doc_info.get('chunks', []))
+            self._version += 1
+
+            # Drop the document's vectors from the index so searches stop
+            # paying distance computations for dead rows. Only safe behind
+            # an ID map: on a plain index (legacy stores loaded from old
+            # sidecars) remove_ids compacts rows and shifts every later
+            # implicit id, corrupting the chunk_start_idx mappings -- those
+            # keep their ghost rows and rely on the search post-filter
+            start = doc_info.get('chunk_start_idx')
+            count = len(doc_info.get('chunks', []))
+            if start is not None and count and \
+                    isinstance(self.index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+                try:
+                    removed = self.index.remove_ids(
+                        np.arange(start, start + count, dtype=np.int64)
+                    )
+                    logger.info(f"Removed {removed} vectors for document {doc_id}")
+                except Exception as e:
+                    logger.warning(f"Could not remove vectors from index: {str(e)}")
+
+            # Persist in the background instead of blocking on disk here
+            self._dirty.set()
+
+
         logger.info(f"Document {doc_id} removed from vector store")
         return True
     
@@ -219,7 +718,9 @@ class VectorStore:
                 'id': doc_id,
                 'filename': doc_info.get('filename', doc_id),
                 'upload_time': doc_info.get('upload_time'),
-                'text': doc_info.get('text', ''),
+                # Legacy entries carry the pre-joined text; otherwise
+                # reassemble it from the chunks only when asked for
+                'text': doc_info.get('text') or ' '.join(doc_info.get('chunks', [])),
                 'chunks': doc_info.get('chunks', []),
                 'chunks_count': len(doc_info.get('chunks', []))
             }
@@ -237,26 +738,86 @@ class VectorStore:
         """
         if metadata is None:
             metadata = {}
-            
-        # Store document info
-        self.documents[document_id] = {
-            'chunks': text_chunks,
-            'chunk_start_idx': len(self.doc_ids),
-            'filename': metadata.get('filename', document_id),
-            'upload_time': metadata.get('upload_time'),
-            'text': ' '.join(text_chunks)  # Join chunks for full text
-        }
-        
-        # Add embeddings to FAISS index
-        embeddings_np = np.array(embeddings).astype('float32')
-        self.index.add(embeddings_np)
-        
-        # Track document IDs for each embedding
-        for _ in range(len(text_chunks)):
-            self.doc_ids.append(document_id)
-            
-        # Save after adding
-        self.save()
-        
+
+        with self._store_lock:
+            # Store document info
+            self.documents[document_id] = {
+                'chunks': self._intern_chunks(text_chunks),
+                'chunk_start_idx': len(self._doc_id_idx),
+                'filename': metadata.get('filename', document_id),
+                'upload_time': metadata.get('upload_time')
+                # Full text is not stored: it would duplicate every chunk;
+                # get_document joins the chunks on demand instead
+            }
+
+            # Add embeddings to FAISS index; asarray skips the copy when the
+            # caller already hands us contiguous float32
+            embeddings_np = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+            assert embeddings_np.shape[1] == self.dimension, \
+                f"Expected dimension {self.dimension}, got {embeddings_np.shape[1]}"
+            self._ensure_trained(embeddings_np)
+
+            # Track document IDs for each embedding
+            self._append_doc_ids(document_id, len(text_chunks))
+
+            self._version += 1
+
+            # Persist incrementally: one metadata line now, a full snapshot
+            # (FAISS index + metadata) once every _save_interval documents
+            self._append_meta(document_id)
+            self._docs_since_save += 1
+            if self._docs_since_save >= self._save_interval:
+                self._dirty.set()
+
         logger.info(f"Document {document_id} added with {len(text_chunks)} chunks")
         return document_id
+
+    def add_documents_bulk(self, documents):
+        """
+        Add several documents to the vector store with a single FAISS insert
+
+        Args:
+            documents: List of dicts carrying the add_document arguments:
+                'document_id', 'text_chunks', 'embeddings' and an optional
+                'metadata' dict
+
+        Returns:
+            list: IDs of the added documents
+
+        Stacking every document's embeddings into one preallocated matrix
+        pays the Python/FAISS boundary cost (and, for IVF indexes, the
+        coarse quantizer pass) once for the whole batch instead of once
+        per document.
+        """
+        counts = [len(doc['embeddings']) for doc in documents]
+        total = sum(counts)
+        with self._store_lock:
+            stacked = np.empty((total, self.dimension), dtype=np.float32)
+            row = 0
+            base = len(self._doc_id_idx)
+            for doc, count in zip(documents, counts):
+                # The slice assignment converts and validates shape in place
+                stacked[row:row + count] = doc['embeddings']
+                metadata = doc.get('metadata') or {}
+                self.documents[doc['document_id']] = {
+                    'chunks': self._intern_chunks(doc['text_chunks']),
+                    'chunk_start_idx': base + row,
+                    'filename': metadata.get('filename', doc['document_id']),
+                    'upload_time': metadata.get('upload_time')
+                }
+                row += count
+
+            if total:
+                self._ensure_trained(stacked)
+            for doc, count in zip(documents, counts):
+                self._append_doc_ids(doc['document_id'], count)
+
+            self._version += 1
+            for doc in documents:
+                self._append_meta(doc['document_id'])
+            self._docs_since_save += len(documents)
+            if self._docs_since_save >= self._save_interval:
+                self._dirty.set()
+
+        logger.info(f"Added {len(documents)} documents ({total} chunks) in bulk")
+        return [doc['document_id'] for doc in documents]
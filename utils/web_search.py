@@ -1,24 +1,119 @@
 # utils/web_search.py
 import requests
+from requests.adapters import HTTPAdapter, Retry
 import os
 from dotenv import load_dotenv
+import asyncio
+import logging
+import threading
 import time
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class WebSearch:
     def __init__(self):
-        self.api_key = os.getenv("SERP_API_KEY") 
+        self.api_key = os.getenv("SERP_API_KEY")
         self.search_engine_id = os.getenv("GOOGLE_CSE_ID")
-        self.last_request = 0
         self.min_delay = 1  # Minimum delay between requests in seconds
-        
+        # Next instant a request may go out, on the monotonic clock (immune
+        # to wall-clock jumps from NTP); the lock keeps concurrent sync
+        # callers from claiming the same slot
+        self._next_allowed = 0.0
+        self._rate_lock = threading.Lock()
+        # Pooled session with keep-alive and retry on transient errors
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=10, pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.3,
+                              status_forcelist=[429, 500, 502, 503, 504])
+        ))
+        # httpx client for asearch, created lazily and keyed on the event
+        # loop it was made under
+        self._aclient = None
+        self._aclient_loop = None
+
+    def _reserve_slot(self):
+        """Claim the next request slot; returns how long to wait for it.
+
+        Reserving up front (instead of checking elapsed time after the
+        response) means the wait can be served by time.sleep or
+        asyncio.sleep without holding the lock while sleeping.
+        """
+        with self._rate_lock:
+            now = time.monotonic()
+            delay = max(0.0, self._next_allowed - now)
+            self._next_allowed = max(now, self._next_allowed) + self.min_delay
+            return delay
+
+    def _format_results(self, results):
+        """Shape the raw API body into the result dicts callers expect"""
+        formatted_results = []
+        if 'items' in results:
+            for item in results['items']:
+                formatted_results.append({
+                    'title': item.get('title', ''),
+                    'snippet': item.get('snippet', ''),
+                    'link': item.get('link', ''),
+                    'source': 'web'
+                })
+        return formatted_results
+
+    async def asearch(self, query, num_results=3):
+        """Async variant of search, suitable for asyncio.gather fan-out.
+
+        Falls back to the sync path when httpx isn't installed.
+        """
+        if httpx is None:
+            return self.search(query, num_results=num_results)
+
+        # Rate limiting without blocking the event loop
+        delay = self._reserve_slot()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        try:
+            # Rebuild the client when the running loop changes: keep-alive
+            # connections from a closed asyncio.run loop are unusable
+            loop = asyncio.get_running_loop()
+            if self._aclient is None or self._aclient_loop is not loop:
+                self._aclient = httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=20,
+                                        max_keepalive_connections=10)
+                )
+                self._aclient_loop = loop
+            response = await self._aclient.get(
+                "https://www.googleapis.com/customsearch/v1",
+                params={
+                    'key': self.api_key,
+                    'cx': self.search_engine_id,
+                    'q': query,
+                    'num': num_results
+                },
+                timeout=10
+            )
+
+            if response.status_code != 200:
+                logger.warning(f"Search API error: {response.status_code}")
+                return []
+
+            return self._format_results(response.json())
+        except Exception as e:
+            logger.error(f"Error performing web search: {str(e)}")
+            return []
+
     def search(self, query, num_results=3):
         """Search the web for information related to the query"""
         # Rate limiting
-        current_time = time.time()
-        if current_time - self.last_request < self.min_delay:
-            time.sleep(self.min_delay - (current_time - self.last_request))
+        delay = self._reserve_slot()
+        if delay > 0:
+            time.sleep(delay)
         
         try:
             # Google Custom Search API
@@ -30,30 +125,17 @@ class WebSearch:
                 'num': num_results
             }
             
-            response = requests.get(url, params=params)
-            self.last_request = time.time()
+            response = self.session.get(url, params=params, timeout=10)
             
             if response.status_code != 200:
-                print(f"Search API error: {response.status_code}")
+                logger.warning(f"Search API error: {response.status_code}")
                 return []
-            
-            results = response.json()
-            
-            # Format and return relevant information
-            formatted_results = []
-            if 'items' in results:
-                for item in results['items']:
-                    formatted_results.append({
-                        'title': item.get('title', ''),
-                        'snippet': item.get('snippet', ''),
-                        'link': item.get('link', ''),
-                        'source': 'web'
-                    })
-            
-            return formatted_results
-            
+
+            return self._format_results(response.json())
+
+
         except Exception as e:
-            print(f"Error performing web search: {str(e)}")
+            logger.error(f"Error performing web search: {str(e)}")
             return []
         
 def perform_web_search(query, num_results=3):